@@ -0,0 +1,75 @@
+import json
+import logging
+from typing import TYPE_CHECKING
+
+import aio_pika
+import aio_pika.abc
+
+from app.config.settings import app_config
+from app.db.schemas import ProductFetchResultSchema
+from app.workers.retry import RetryPolicy
+
+if TYPE_CHECKING:
+    from app.bot.uzum_bot import UzumBot
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationConsumer:
+    """Доставка пользователям оповещений об изменении цен из очереди notification.
+
+    Сообщение подтверждается только после отправки, поэтому доставка - at-least-once. Если отправить
+    не удалось, сообщение уходит в очереди повторов с задержкой, после max_retries - в notification.dlq.
+    """
+
+    connection: aio_pika.abc.AbstractRobustConnection | None = None
+    channel: aio_pika.abc.AbstractChannel
+    queue: aio_pika.abc.AbstractQueue
+    retry_policy: RetryPolicy
+
+    def __init__(self, bot: "UzumBot", prefetch_count: int = 10) -> None:
+        self.bot = bot
+        self.prefetch_count = prefetch_count
+
+    async def start(self) -> None:
+        self.connection = await aio_pika.connect_robust(app_config.rabbitmq.rabbitmq_uri)
+        self.channel = await self.connection.channel()
+        await self.channel.set_qos(prefetch_count=self.prefetch_count)
+        exchange = await self.channel.declare_exchange(
+            app_config.rabbitmq.exchange, type=app_config.rabbitmq.exchange_type, durable=True
+        )
+        self.queue = await self.channel.declare_queue(app_config.rabbitmq.queue_notification, durable=True)
+        await self.queue.bind(exchange, routing_key=app_config.rabbitmq.routing_key_notification)
+        self.retry_policy = RetryPolicy(
+            app_config.rabbitmq.queue_notification,
+            app_config.rabbitmq.routing_key_notification,
+            max_retries=app_config.worker.max_retries,
+            base_delay=app_config.worker.retry_base_delay,
+        )
+        await self.retry_policy.declare(self.channel, app_config.rabbitmq.exchange)
+        await self.queue.consume(self.handle_message)
+
+    async def close(self) -> None:
+        if self.connection:
+            await self.connection.close()
+
+    async def handle_message(self, message: aio_pika.abc.AbstractIncomingMessage) -> None:
+        try:
+            payload = json.loads(message.body.decode())
+            telegram_id = int(payload["telegram_id"])
+            products = [ProductFetchResultSchema.model_validate(product) for product in payload["products"]]
+        except (KeyError, TypeError, ValueError) as exc:
+            logger.exception("invalid notification message: %s", message.body)
+            await self.retry_policy.dead_letter(message, exc)
+            return
+
+        try:
+            await self.bot.send_notification(telegram_id, products)
+            await message.ack()
+        except Exception as exc:
+            logger.exception("error sending notification")
+            try:
+                await self.retry_policy.retry(message, exc)
+            except Exception:
+                logger.exception("error scheduling retry, requeue")
+                await message.nack(requeue=True)
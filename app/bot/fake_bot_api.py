@@ -0,0 +1,104 @@
+"""Заглушка Bot API для нагрузочных проверок.
+
+    python -m app.bot.fake_bot_api --port 8081 --flood-ratio 0.01 --blocked-ratio 0.02
+
+Бот подключается к ней через TG_API_URL=http://localhost:8081. sendMessage отвечает сообщением,
+часть запросов получает 429 с retry_after, чаты из доли blocked-ratio - 403 (бот заблокирован).
+Остальные методы отвечают {"ok": true, "result": true}.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from logging import config as logging_config
+from logging import getLogger
+
+from aiohttp import web
+
+from app.config.logging import LOGGING
+
+logger = getLogger(__name__)
+
+
+@dataclass
+class FakeBotApi:
+    flood_ratio: float = 0  # доля запросов, получающих 429
+    retry_after: int = 1
+    blocked_ratio: float = 0  # доля чатов, заблокировавших бота
+    latency: float = 0  # секунд на ответ
+    seed: int | None = None
+    responses: dict[int, int] = field(default_factory=dict)  # статус -> число ответов
+
+    def __post_init__(self):
+        self._random = random.Random(self.seed)
+        self._message_id = 0
+
+    def is_blocked(self, chat_id: int) -> bool:
+        # детерминированно по chat_id, чтобы повтор в тот же чат тоже получал 403
+        return random.Random(chat_id).random() < self.blocked_ratio
+
+    async def send_message(self, request: web.Request) -> web.Response:
+        data = await request.post()
+        chat_id = int(data["chat_id"])
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if self.is_blocked(chat_id):
+            return self._error(403, "Forbidden: bot was blocked by the user")
+        if self._random.random() < self.flood_ratio:
+            return self._error(
+                429,
+                f"Too Many Requests: retry after {self.retry_after}",
+                parameters={"retry_after": self.retry_after},
+            )
+
+        self._message_id += 1
+        message = {
+            "message_id": self._message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "text": data.get("text", ""),
+        }
+        return self._ok(message)
+
+    async def other_method(self, request: web.Request) -> web.Response:
+        return self._ok(True)
+
+    def _ok(self, result) -> web.Response:
+        self.responses[200] = self.responses.get(200, 0) + 1
+        return web.json_response({"ok": True, "result": result})
+
+    def _error(self, status: int, description: str, **extra) -> web.Response:
+        self.responses[status] = self.responses.get(status, 0) + 1
+        return web.json_response(
+            {"ok": False, "error_code": status, "description": description, **extra}, status=status
+        )
+
+
+def create_app(fake_api: FakeBotApi) -> web.Application:
+    app = web.Application()
+    app.router.add_post("/bot{token}/sendMessage", fake_api.send_message)
+    app.router.add_post("/bot{token}/{method}", fake_api.other_method)
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Заглушка Bot API")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--flood-ratio", type=float, default=0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--blocked-ratio", type=float, default=0)
+    parser.add_argument("--latency", type=float, default=0)
+    args = parser.parse_args()
+
+    logging_config.dictConfig(LOGGING)
+    fake_api = FakeBotApi(args.flood_ratio, args.retry_after, args.blocked_ratio, args.latency)
+    web.run_app(create_app(fake_api), host=args.host, port=args.port, access_log=None)
+    logger.info("responses: %s", fake_api.responses)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,25 @@
+import logging
+import time
 from typing import Any, Awaitable, Callable, Dict
 
 from aiogram import BaseMiddleware
-from aiogram.types import TelegramObject
+from aiogram.types import TelegramObject, Update
 
+from app.cache.memory import TTLCache
 from app.db.client import DBClient
-from app.db.models import User
+from app.db.profiling import UpdateQueryStats, current_update_stats
+
+logger = logging.getLogger(__name__)
 
 
 class UserIdMiddleware(BaseMiddleware):
-    """Middleware для добавления ID пользователя из БД."""
+    """Middleware для добавления ID пользователя из БД.
+
+    telegram_id -> id кэшируется в памяти процесса, так что большинство апдейтов обходятся без запросов к БД.
+    """
+
+    def __init__(self, cache_size: int = 10_000, cache_ttl: int = 600) -> None:
+        self.cache: TTLCache[int, int] = TTLCache(maxsize=cache_size, ttl=cache_ttl)
 
     async def __call__(
         self,
@@ -20,9 +31,36 @@ class UserIdMiddleware(BaseMiddleware):
         data["user_id"] = await self._get_user_id(user.id, user.username)
         return await handler(event, data)
 
-    async def _get_user_id(self, user_id: int, username: str | None = None) -> int:
+    async def _get_user_id(self, telegram_id: int, username: str | None = None) -> int:
+        if (user_id := self.cache.get(telegram_id)) is not None:
+            return user_id
+
         async with DBClient() as db_client:
-            user = await db_client.get_user_by_telegram_id(user_id)
-            if not user:
-                user = await db_client.create_object(User, telegram_id=user_id, username=username)
-        return user.id
+            user_id = await db_client.upsert_user(telegram_id, username)
+        self.cache.set(telegram_id, user_id)
+        return user_id
+
+
+class QueryProfilingMiddleware(BaseMiddleware):
+    """Число запросов к БД и время в БД на каждый апдейт, включается вместе с POSTGRES_PROFILE_QUERIES."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        stats = UpdateQueryStats()
+        token = current_update_stats.set(stats)
+        started_at = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            current_update_stats.reset(token)
+            logger.info(
+                "update %s: %s queries, %.1fms in db, %.1fms total",
+                event.update_id if isinstance(event, Update) else "-",
+                stats.queries,
+                stats.total_time * 1000,
+                (time.perf_counter() - started_at) * 1000,
+            )
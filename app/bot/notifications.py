@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterable
+
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+
+from app.db.client import DBClient
+from app.metrics.metrics import FAILURES, NOTIFICATION_SEND_SECONDS, NOTIFICATIONS
+from app.ratelimit.token_bucket import TokenBucket
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+    from aiogram.types import InlineKeyboardMarkup
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Notification:
+    chat_id: int
+    text: str
+    reply_markup: "InlineKeyboardMarkup | None" = None
+
+
+@dataclass
+class DispatchStats:
+    sent: int = 0
+    failed: int = 0
+    blocked: int = 0
+    rejected: int = 0
+    retries: int = 0
+    elapsed: float = 0
+
+    def __str__(self):
+        rate = self.sent / self.elapsed if self.elapsed else 0
+        return (
+            f"sent={self.sent}, failed={self.failed}, blocked={self.blocked}, rejected={self.rejected}, "
+            f"retries={self.retries}, elapsed={self.elapsed:.1f}s, rate={rate:.1f} msg/s"
+        )
+
+
+class NotificationDispatcher:
+    """Параллельная рассылка оповещений в пределах лимитов Telegram.
+
+    Общий token bucket ограничивает скорость бота, для каждого чата выдерживается минимальный интервал
+    между сообщениями. После TelegramRetryAfter рассылка приостанавливается на retry_after и сообщение
+    повторяется; пользователи, заблокировавшие бота, помечаются неактивными.
+
+    Окончательными считаются только блокировка бота и TelegramBadRequest. Остальные ошибки (сеть, 5xx,
+    исчерпанные повторы после 429) пробрасываются из send_many после завершения рассылки, чтобы
+    сообщение из очереди не было подтверждено и ушло на повтор.
+    """
+
+    def __init__(
+        self,
+        bot: "Bot",
+        rate: float = 30,
+        per_chat_interval: float = 1,
+        concurrency: int = 10,
+        max_retries: int = 3,
+    ) -> None:
+        self.bot = bot
+        self.bucket = TokenBucket(rate)
+        self.per_chat_interval = per_chat_interval
+        self.max_retries = max_retries
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._chat_locks: dict[int, asyncio.Lock] = {}
+        self._chat_sent_at: dict[int, float] = {}
+
+    async def send_many(self, notifications: Iterable[Notification]) -> DispatchStats:
+        stats = DispatchStats()
+        blocked: list[int] = []
+        started_at = time.monotonic()
+
+        results = await asyncio.gather(
+            *(self._send(notification, stats, blocked) for notification in notifications), return_exceptions=True
+        )
+        errors = [result for result in results if isinstance(result, BaseException)]
+
+        if blocked:
+            await self._deactivate_users(blocked)
+        self._forget_idle_chats()
+        stats.elapsed = time.monotonic() - started_at
+        logger.info("notifications dispatched: %s", stats)
+        if errors:
+            raise errors[0]
+        return stats
+
+    async def _send(self, notification: Notification, stats: DispatchStats, blocked: list[int]) -> None:
+        async with self._chat_lock(notification.chat_id), self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                await self._wait_for_chat(notification.chat_id)
+                await self.bucket.acquire()
+                try:
+                    with NOTIFICATION_SEND_SECONDS.time():
+                        await self.bot.send_message(
+                            notification.chat_id, notification.text, reply_markup=notification.reply_markup
+                        )
+                except TelegramRetryAfter as exc:
+                    FAILURES.labels(kind="telegram_retry_after").inc()
+                    logger.warning("flood limit, retry after %s s", exc.retry_after)
+                    self.bucket.pause(exc.retry_after)
+                    if attempt < self.max_retries:
+                        stats.retries += 1
+                        continue
+                    stats.failed += 1
+                    NOTIFICATIONS.labels(result="failed").inc()
+                    raise
+                except TelegramForbiddenError:
+                    logger.info("bot blocked by %s", notification.chat_id)
+                    blocked.append(notification.chat_id)
+                    stats.blocked += 1
+                    NOTIFICATIONS.labels(result="blocked").inc()
+                except TelegramBadRequest:
+                    # повтор не поможет: чат не найден, неверная разметка и т.п.
+                    logger.exception("notification to %s rejected", notification.chat_id)
+                    stats.rejected += 1
+                    NOTIFICATIONS.labels(result="rejected").inc()
+                    FAILURES.labels(kind="telegram_bad_request").inc()
+                except Exception:
+                    stats.failed += 1
+                    NOTIFICATIONS.labels(result="failed").inc()
+                    FAILURES.labels(kind="telegram_api").inc()
+                    raise
+                else:
+                    stats.sent += 1
+                    NOTIFICATIONS.labels(result="sent").inc()
+                finally:
+                    self._chat_sent_at[notification.chat_id] = time.monotonic()
+                return
+
+    async def _deactivate_users(self, telegram_ids: list[int]) -> None:
+        async with DBClient() as db_client:
+            await db_client.deactivate_users(telegram_ids)
+
+    async def _wait_for_chat(self, chat_id: int) -> None:
+        if (sent_at := self._chat_sent_at.get(chat_id)) is None:
+            return
+        if (delay := sent_at + self.per_chat_interval - time.monotonic()) > 0:
+            await asyncio.sleep(delay)
+
+    def _chat_lock(self, chat_id: int) -> asyncio.Lock:
+        return self._chat_locks.setdefault(chat_id, asyncio.Lock())
+
+    def _forget_idle_chats(self) -> None:
+        expired_at = time.monotonic() - self.per_chat_interval
+        for chat_id, sent_at in list(self._chat_sent_at.items()):
+            lock = self._chat_locks.get(chat_id)
+            if sent_at < expired_at and not (lock and lock.locked()):
+                self._chat_sent_at.pop(chat_id, None)
+                self._chat_locks.pop(chat_id, None)
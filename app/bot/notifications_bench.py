@@ -0,0 +1,88 @@
+"""Пропускная способность рассылки через NotificationDispatcher на заглушке Bot API.
+
+    python -m app.bot.notifications_bench --messages 2000 --chats 500 --rate 30 --flood-ratio 0.01 --blocked-ratio 0.02
+
+Заглушка (app.bot.fake_bot_api) поднимается в том же процессе. Заблокировавшие бота пользователи
+только считаются, в БД не записываются.
+"""
+
+import argparse
+import asyncio
+import time
+from logging import config as logging_config
+from logging import getLogger
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiohttp import web
+
+from app.bot.fake_bot_api import FakeBotApi, create_app
+from app.bot.notifications import Notification, NotificationDispatcher
+from app.config.logging import LOGGING
+
+logging_config.dictConfig(LOGGING)
+logger = getLogger(__name__)
+
+
+class BenchDispatcher(NotificationDispatcher):
+    async def _deactivate_users(self, telegram_ids: list[int]) -> None:
+        logger.info("%s users blocked the bot", len(telegram_ids))
+
+
+async def run(
+    messages: int, chats: int, rate: float, concurrency: int, max_retries: int, fake_api: FakeBotApi, port: int
+) -> None:
+    runner = web.AppRunner(create_app(fake_api), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "localhost", port).start()
+
+    session = AiohttpSession(api=TelegramAPIServer.from_base(f"http://localhost:{port}"))
+    bot = Bot("123456:bench", session=session)
+    dispatcher = BenchDispatcher(bot, rate=rate, concurrency=concurrency, max_retries=max_retries)
+    notifications = [Notification(10_000_000 + i % chats, f"bench {i}") for i in range(messages)]
+
+    started_at = time.monotonic()
+    try:
+        stats = await dispatcher.send_many(notifications)
+    except Exception as exc:
+        # транзиентные ошибки пробрасываются после рассылки, итог виден по ответам заглушки
+        logger.warning("dispatch raised %r", exc)
+    else:
+        logger.info("dispatcher: %s", stats)
+    elapsed = time.monotonic() - started_at
+
+    await bot.session.close()
+    await runner.cleanup()
+
+    delivered = fake_api.responses.get(200, 0)
+    logger.info(
+        "%s/%s delivered in %.1fs (%.1f msg/s), responses=%s",
+        delivered,
+        messages,
+        elapsed,
+        delivered / elapsed,
+        fake_api.responses,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Нагрузочная проверка рассылки оповещений")
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--chats", type=int, default=500, help="число разных получателей")
+    parser.add_argument("--rate", type=float, default=30, help="лимит сообщений в секунду")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--max-retries", type=int, default=3)
+    parser.add_argument("--flood-ratio", type=float, default=0, help="доля ответов 429")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--blocked-ratio", type=float, default=0, help="доля чатов с ответом 403")
+    parser.add_argument("--latency", type=float, default=0.05, help="задержка ответа заглушки, с")
+    parser.add_argument("--port", type=int, default=8081)
+    args = parser.parse_args()
+
+    fake_api = FakeBotApi(args.flood_ratio, args.retry_after, args.blocked_ratio, args.latency)
+    asyncio.run(run(args.messages, args.chats, args.rate, args.concurrency, args.max_retries, fake_api, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import copy
+import datetime
+import logging
+import time
+from typing import Any, Mapping
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+
+from app.cache.invalidation import INSTANCE_ID
+from app.cache.memory import MemoryCacheBackend
+from app.db.client import DBClient
+
+logger = logging.getLogger(__name__)
+
+
+def fsm_cache_tag(key: str) -> str:
+    """Тег записи, совпадает с payload триггера fsm_states_cache_invalidation."""
+
+    return f"fsm:{key}"
+
+
+class PostgresStorage(BaseStorage):
+    """FSM-хранилище aiogram в таблице fsm_states.
+
+    Состояния переживают перезапуск и общие для реплик бота. Запись идет сразу в БД и в кэш процесса
+    (write-through), чтение из кэша обходится без запросов. Триггер на fsm_states шлет NOTIFY с тегом
+    fsm:<key> и источником origin, и PostgresInvalidationListener сбрасывает запись в кэше остальных реплик,
+    так что изменение, сделанное другой репликой, видно сразу. Кэш подключается к слушателю через storage.cache, без
+    слушателя при нескольких репликах его нужно отключить (cache_ttl=0). Брошенные состояния истекают
+    через state_ttl и удаляются не чаще раза в purge_interval.
+    """
+
+    def __init__(
+        self,
+        state_ttl: int = 60 * 60 * 24,
+        cache_size: int = 10_000,
+        cache_ttl: int = 60,
+        purge_interval: int = 60 * 10,
+        key_builder: KeyBuilder | None = None,
+        origin: str = INSTANCE_ID,
+    ) -> None:
+        self.state_ttl = datetime.timedelta(seconds=state_ttl)
+        self.cache: MemoryCacheBackend | None = MemoryCacheBackend(cache_size, cache_ttl) if cache_ttl > 0 else None
+        self.purge_interval = purge_interval
+        self.key_builder = key_builder or DefaultKeyBuilder(with_destiny=True)
+        self.origin = origin
+        self._purged_at = time.monotonic()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        value = state.state if isinstance(state, State) else state
+        await self._write(self.key_builder.build(key), state=value)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        state, _ = await self._read(self.key_builder.build(key))
+        return state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        await self._write(self.key_builder.build(key), data=dict(data))
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        _, data = await self._read(self.key_builder.build(key))
+        return copy.deepcopy(data)
+
+    async def close(self) -> None:
+        if self.cache:
+            await self.cache.clear()
+
+    async def _read(self, key: str) -> tuple[str | None, dict]:
+        generation = None
+        if self.cache:
+            if (record := await self.cache.get(key)) is not None:
+                return record
+            # запись другой реплики, сделанная во время чтения, сбросит тег раньше set
+            generation = await self.cache.generation()
+
+        async with DBClient() as db_client:
+            record = await db_client.get_fsm_record(key) or (None, {})
+        if self.cache:
+            await self.cache.set(key, record, [fsm_cache_tag(key)], generation)
+        return record
+
+    async def _write(self, key: str, **values) -> None:
+        tag = fsm_cache_tag(key)
+        generation = None
+        if self.cache:
+            # чтения, начатые до записи, не перезапишут ее своим результатом
+            await self.cache.invalidate(tag)
+            generation = await self.cache.generation()
+
+        async with DBClient() as db_client:
+            record = await db_client.upsert_fsm_record(key, self.state_ttl, self.origin, **values)
+            if time.monotonic() - self._purged_at > self.purge_interval:
+                self._purged_at = time.monotonic()
+                deleted = await db_client.delete_expired_fsm_records()
+                logger.debug("%s expired fsm states deleted", deleted)
+        if self.cache and not await self.cache.set(key, record, [tag], generation):
+            # во время записи ключ изменила другая реплика, чья запись последняя - неизвестно
+            await self.cache.invalidate(tag)
@@ -1,21 +1,32 @@
+import asyncio
 import logging
 import re
-from datetime import datetime
+import signal
+from datetime import UTC, datetime, timedelta
 from typing import TYPE_CHECKING
 from urllib.parse import parse_qs, urlparse
 
 from aiogram import Bot, Dispatcher, F, Router
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.filters import Command, CommandStart
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
+from aiogram.webhook.aiohttp_server import setup_application
+from aiohttp import web
 from sqlalchemy.exc import IntegrityError
 
+from app.bot.consumer import NotificationConsumer
 from app.bot.keyboards import KeyBoardButtonType, main_kb
-from app.bot.middlewares import UserIdMiddleware
+from app.bot.middlewares import QueryProfilingMiddleware, UserIdMiddleware
+from app.bot.notifications import Notification, NotificationDispatcher
+from app.bot.storage import PostgresStorage
+from app.bot.webhook import BoundedRequestHandler
+from app.cache.invalidation import PostgresInvalidationListener
+from app.cache.memory import MemoryCacheBackend
 from app.config.settings import app_config
-from app.parser.uzum import UzumParser
+from app.metrics.metrics import register_cache_stats
 from app.publisher.publisher import RabbitPublisher
 from app.scheduler.scheduler import ProductScheduler
 from app.services.product import ProductService
@@ -24,7 +35,7 @@ if TYPE_CHECKING:
     from aiogram.fsm.context import FSMContext
     from aiogram.types import CallbackQuery, Message
 
-    from app.db.schemas import ProductFetchResultSchema
+    from app.db.schemas import PriceHistoryItemSchema, PriceHistoryPageSchema, ProductFetchResultSchema
 
 logger = logging.getLogger(__name__)
 
@@ -36,24 +47,76 @@ class BroadcastState(StatesGroup):
 
 
 UZUM_HOSTNAME = "uzum.uz"
+EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+
+
+def format_price(price: float | None) -> str:
+    if price is None:
+        return "?"
+    return f"{price:.2f}".rstrip("0").rstrip(".")
 
 
 class UzumBot:
     """Телеграм бот для отслеживания цен на товары в Узум."""
 
     def __init__(self):
-        self.bot = Bot(token=app_config.telegram.token.get_secret_value())
-        self.dp = Dispatcher(storage=MemoryStorage())
+        session = None
+        if app_config.telegram.api_url:
+            # например, локальный сервер Bot API или заглушка для нагрузочных тестов
+            session = AiohttpSession(api=TelegramAPIServer.from_base(app_config.telegram.api_url))
+        self.bot = Bot(token=app_config.telegram.token.get_secret_value(), session=session)
+        self.storage = PostgresStorage(
+            state_ttl=app_config.telegram.fsm_state_ttl,
+            cache_size=app_config.telegram.fsm_cache_size,
+            cache_ttl=app_config.telegram.fsm_cache_ttl,
+        )
+        self.dp = Dispatcher(storage=self.storage)
         self.router = Router()
 
         self.publisher = RabbitPublisher()
-        self.parser = UzumParser(headless=app_config.parser.headless_mode)
-        self.service = ProductService(self.parser, self.publisher, app_config.min_check_interval)
-        self.scheduler = ProductScheduler(self, self.service, app_config.scheduler.run_interval)
+        # парсинг выполняют воркеры, бот только ставит задачи и рассылает оповещения
+        self.cache = None
+        self.cache_listener = None
+        if app_config.cache.backend == "memory":
+            self.cache = MemoryCacheBackend(app_config.cache.size, app_config.cache.ttl)
+            register_cache_stats("product", self.cache.stats)
+        if self.storage.cache:
+            register_cache_stats("fsm", self.storage.cache.stats)
+        if caches := [cache for cache in (self.cache, self.storage.cache) if cache]:
+            self.cache_listener = PostgresInvalidationListener(caches, app_config.database_dsn)
+        self.service = ProductService(
+            None,
+            self.publisher,
+            app_config.min_check_interval,
+            check_batch_size=app_config.scheduler.check_batch_size,
+            check_lease=app_config.scheduler.check_lease,
+            max_products_per_run=app_config.scheduler.max_products_per_run,
+            cache=self.cache,
+        )
+        self.scheduler = ProductScheduler(
+            self.service,
+            app_config.scheduler.run_interval,
+            cleanup_interval=app_config.scheduler.cleanup_interval,
+            cleanup_batch_size=app_config.scheduler.cleanup_batch_size,
+            price_history_retention_days=app_config.scheduler.price_history_retention_days,
+            price_partitions_ahead=app_config.scheduler.price_partitions_ahead,
+        )
+        self.consumer = NotificationConsumer(self, prefetch_count=app_config.telegram.notifications_concurrency)
+        self.dispatcher = NotificationDispatcher(
+            self.bot,
+            rate=app_config.telegram.notifications_rate,
+            per_chat_interval=app_config.telegram.notifications_per_chat_interval,
+            concurrency=app_config.telegram.notifications_concurrency,
+        )
 
         self.register_handlers()
         self.dp.include_router(self.router)
-        self.dp.update.outer_middleware(UserIdMiddleware())
+        if app_config.db.profile_queries:
+            # первым, чтобы учесть и запросы UserIdMiddleware
+            self.dp.update.outer_middleware(QueryProfilingMiddleware())
+        self.dp.update.outer_middleware(
+            UserIdMiddleware(app_config.telegram.user_cache_size, app_config.telegram.user_cache_ttl)
+        )
 
     def register_handlers(self):
         self.router.message.register(self.handle_start, CommandStart())
@@ -66,17 +129,83 @@ class UzumBot:
         self.router.callback_query.register(self.product_price_history_callback, F.data.startswith("history_"))
 
     async def on_startup(self, dispatcher):
+        if self.cache_listener:
+            await self.cache_listener.start()
         await self.publisher.start()
-        await self.scheduler.start()
+        await self.consumer.start()
+        # при нескольких репликах планировщик включают только в одной
+        if app_config.scheduler.enabled:
+            await self.scheduler.start()
 
     async def on_shutdown(self, dispatcher):
+        if app_config.scheduler.enabled:
+            await self.scheduler.stop()
+        await self.consumer.close()
         await self.publisher.close()
-        await self.scheduler.stop()
+        if self.cache_listener:
+            await self.cache_listener.stop()
+        if self.cache:
+            logger.info("product cache: %s", self.cache.stats)
+
+    async def is_connected_to_rabbitmq(self) -> bool:
+        connections = (getattr(self.publisher, "connection", None), self.consumer.connection)
+        return all(connection and not connection.is_closed for connection in connections)
 
     async def run(self):
         self.dp.startup.register(self.on_startup)
         self.dp.shutdown.register(self.on_shutdown)
-        await self.dp.start_polling(self.bot)
+        if app_config.telegram.mode == "webhook":
+            await self.run_webhook()
+        else:
+            await self.dp.start_polling(self.bot)
+
+    async def run_webhook(self):
+        """Прием обновлений по вебхуку; реплик может быть несколько за одним балансировщиком.
+
+        Работает до SIGINT/SIGTERM, затем перестает принимать запросы, дожидается обновлений, на которые
+        уже ответили 200, и останавливает consumer, publisher и слушатель кэша.
+        """
+
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop_event.set)
+
+        config = app_config.telegram
+        secret_token = config.webhook_secret.get_secret_value() if config.webhook_secret else None
+        app = web.Application()
+        handler = BoundedRequestHandler(
+            self.dp,
+            self.bot,
+            secret_token=secret_token,
+            max_concurrency=config.webhook_max_concurrency,
+            max_pending=config.webhook_max_pending,
+        )
+        handler.register(app, path=config.webhook_path)
+        setup_application(app, self.dp, bot=self.bot)
+
+        runner = web.AppRunner(app)
+        await runner.setup()
+        try:
+            await web.TCPSite(runner, config.webhook_host, config.webhook_port).start()
+            if config.webhook_url and config.webhook_set_on_startup:
+                # вызов идемпотентен, реплики могут делать его одновременно; при остановке вебхук не удаляем,
+                # чтобы не отключить остальные реплики
+                await self.bot.set_webhook(
+                    config.webhook_url.rstrip("/") + config.webhook_path,
+                    secret_token=secret_token,
+                    max_connections=config.webhook_max_connections,
+                    allowed_updates=self.dp.resolve_used_update_types(),
+                )
+            logger.info("webhook listening on %s:%s%s", config.webhook_host, config.webhook_port, config.webhook_path)
+            await stop_event.wait()
+            logger.info("stopping webhook")
+        finally:
+            # on_shutdown приложения: сначала BoundedRequestHandler.close, затем on_shutdown диспетчера
+            await runner.cleanup()
+            await self.bot.session.close()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.remove_signal_handler(sig)
 
     async def handle_start(self, message: "Message"):
         """Обработка команды старт."""
@@ -151,32 +280,86 @@ class UzumBot:
         await message.answer("Ваш список товаров:", reply_markup=builder.as_markup())
 
     async def product_price_history_callback(self, callback: "CallbackQuery"):
-        """Получение истории цен на продукт."""
+        """Получение истории цен на продукт постранично.
+
+        callback_data: history_{product_id} - первая страница,
+        history_{product_id}_{o|n}_{created_at в мкс}_{price_id} - страница старше/новее записи.
+        """
+
+        product_id, *page = callback.data.replace("history_", "").split("_")
+        cursor, older = None, True
+        if page:
+            direction, timestamp, price_id = page
+            created_at = EPOCH + timedelta(microseconds=int(timestamp))
+            cursor, older = (created_at, int(price_id)), direction == "o"
+
+        history = await self.service.get_price_history(
+            int(product_id), cursor, older, page_size=app_config.telegram.history_page_size
+        )
+        if not history:
+            await callback.answer("Товар не найден.", show_alert=True)
+            return
 
-        product_id = int(callback.data.replace("history_", ""))
-        product = await self.service.get_product_with_prices(product_id)
-        message = f"{product.title}. История цен: "
-        for price in product.prices:
-            message = f"{message}\n{datetime.strftime(price.created_at, '%d.%m.%Y')} - {price.price}"
-        await callback.message.answer(message)
+        lines = [f"{history.title}. Текущая цена: {format_price(history.current_price)}"]
+        for stats in history.stats:
+            if stats.min_price is not None:
+                lines.append(
+                    f"{stats.days} дн.: мин {format_price(stats.min_price)}, "
+                    f"макс {format_price(stats.max_price)}, сред {format_price(stats.avg_price)}"
+                )
+        builder = InlineKeyboardBuilder()
+        if history.items:
+            lines.append("История цен:")
+            lines.extend(self._history_item_line(item) for item in history.items)
+            buttons = []
+            if history.has_newer:
+                buttons.append(
+                    InlineKeyboardButton(text="« Новее", callback_data=self._history_page_data(history, "n"))
+                )
+            if history.has_older:
+                buttons.append(
+                    InlineKeyboardButton(text="Старше »", callback_data=self._history_page_data(history, "o"))
+                )
+            if buttons:
+                builder.row(*buttons)
+        else:
+            lines.append("История цен пуста.")
+
+        text = "\n".join(lines)
+        if page:
+            await callback.message.edit_text(text, reply_markup=builder.as_markup())
+        else:
+            await callback.message.answer(text, reply_markup=builder.as_markup())
+        await callback.answer()
+
+    @staticmethod
+    def _history_item_line(item: "PriceHistoryItemSchema") -> str:
+        line = f"{datetime.strftime(item.created_at, '%d.%m.%Y')} - {format_price(item.price)}"
+        if item.min_price != item.max_price:
+            # запись за день из свернутой истории
+            line += f" (мин {format_price(item.min_price)}, макс {format_price(item.max_price)})"
+        return line
+
+    @staticmethod
+    def _history_page_data(history: "PriceHistoryPageSchema", direction: str) -> str:
+        item = history.items[-1] if direction == "o" else history.items[0]
+        timestamp = (item.created_at - EPOCH) // timedelta(microseconds=1)
+        return f"history_{history.product_id}_{direction}_{timestamp}_{item.id}"
 
-    async def send_notification_for_updated_products(
-        self, user_products: dict[int, list["ProductFetchResultSchema"]]
-    ) -> None:
-        """Оповестить об изменениях в продутках."""
+    async def send_notification(self, telegram_id: int, updated_products: list["ProductFetchResultSchema"]) -> None:
+        """Оповестить пользователя об изменениях в продуктах."""
 
-        for user_telegram_id, products in user_products.items():
-            await self.send_notification(user_telegram_id, products)
+        await self.dispatcher.send_many([self.build_notification(telegram_id, updated_products)])
 
-    async def send_notification(self, telegram_id: int, updated_products: list["ProductFetchResultSchema"]) -> None:
-        """Отправка оповещения пользователю об изменении цены на товар."""
+    def build_notification(self, telegram_id: int, updated_products: list["ProductFetchResultSchema"]) -> Notification:
+        """Оповещение пользователя об изменении цены на товар."""
 
         builder = InlineKeyboardBuilder()
         for product in updated_products:
             builder.row(
                 InlineKeyboardButton(text=f"{product.title[:40]}. Новая цена: {product.new_price}", url=product.url)
             )
-        await self.bot.send_message(telegram_id, "Измененные цены на товары:", reply_markup=builder.as_markup())
+        return Notification(telegram_id, "Измененные цены на товары:", builder.as_markup())
 
     async def delete_product(self, message: "Message", user_id: int):
         """Список товара для удаления."""
@@ -0,0 +1,53 @@
+import asyncio
+import logging
+from typing import Any
+
+from aiogram import Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+
+class BoundedRequestHandler(SimpleRequestHandler):
+    """Прием обновлений по вебхуку: сразу отвечаем 200, обрабатываем в фоне не больше max_concurrency.
+
+    Если в обработке и в ожидании уже max_pending обновлений, отвечаем 503, и Telegram повторит доставку
+    позже - так очередь в памяти не растет без предела, пока реплика перегружена.
+    """
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        secret_token: str | None = None,
+        max_concurrency: int = 50,
+        max_pending: int = 1000,
+        **data: Any,
+    ) -> None:
+        super().__init__(dispatcher, bot, handle_in_background=True, secret_token=secret_token, **data)
+        self.max_pending = max_pending
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if len(self._background_feed_update_tasks) >= self.max_pending:
+            logger.warning("webhook overloaded, %s updates pending", len(self._background_feed_update_tasks))
+            return web.Response(status=503)
+        return await super().handle(request)
+
+    async def close(self) -> None:
+        # дожидаемся обновлений, на которые уже ответили 200, иначе они потеряются;
+        # сессию бота закрывает UzumBot после остановки остальных компонентов
+        if self._background_feed_update_tasks:
+            logger.info("waiting for %s webhook updates", len(self._background_feed_update_tasks))
+            await asyncio.gather(*self._background_feed_update_tasks, return_exceptions=True)
+
+    async def _background_feed_update(self, bot: Bot, update: dict[str, Any]) -> None:
+        async with self._semaphore:
+            try:
+                result = await self.dispatcher.feed_raw_update(bot=bot, update=update, **self.data)
+                if isinstance(result, TelegramMethod):
+                    await self.dispatcher.silent_call_request(bot=bot, result=result)
+            except Exception:
+                logger.exception("error handling update %s", update.get("update_id"))
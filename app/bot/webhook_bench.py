@@ -0,0 +1,80 @@
+"""Нагрузочная проверка вебхука синтетическими обновлениями.
+
+    python -m app.bot.webhook_bench --url http://localhost:8080/webhook --updates 5000 --concurrency 100
+
+Обработчики отвечают пользователям через Bot API, поэтому бота стоит запускать с TG_API_URL,
+указывающим на заглушку (python -m app.bot.fake_bot_api), и TG_WEBHOOK_SET_ON_STARTUP=false.
+"""
+
+import argparse
+import asyncio
+import time
+from logging import config as logging_config
+from logging import getLogger
+
+import aiohttp
+
+from app.config.logging import LOGGING
+
+logging_config.dictConfig(LOGGING)
+logger = getLogger(__name__)
+
+
+def make_update(update_id: int, users: int) -> dict:
+    user_id = 10_000_000 + update_id % users
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "bench"},
+            "text": "/start",
+        },
+    }
+
+
+async def run(url: str, updates: int, concurrency: int, users: int, secret: str | None) -> None:
+    headers = {"X-Telegram-Bot-Api-Secret-Token": secret} if secret else {}
+    latencies: list[float] = []
+    statuses: dict[int, int] = {}
+    update_ids = iter(range(updates))
+
+    async def sender(session: aiohttp.ClientSession) -> None:
+        for update_id in update_ids:
+            started_at = time.monotonic()
+            async with session.post(url, json=make_update(update_id, users), headers=headers) as response:
+                await response.read()
+            latencies.append(time.monotonic() - started_at)
+            statuses[response.status] = statuses.get(response.status, 0) + 1
+
+    started_at = time.monotonic()
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*(sender(session) for _ in range(concurrency)))
+    elapsed = time.monotonic() - started_at
+
+    latencies.sort()
+    logger.info(
+        "%s updates in %.1fs (%.0f/s), statuses=%s, p50=%.1fms, p99=%.1fms",
+        len(latencies),
+        elapsed,
+        len(latencies) / elapsed,
+        statuses,
+        latencies[len(latencies) // 2] * 1000,
+        latencies[int(len(latencies) * 0.99)] * 1000,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Синтетическая нагрузка на вебхук бота")
+    parser.add_argument("--url", default="http://localhost:8080/webhook")
+    parser.add_argument("--updates", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--users", type=int, default=100, help="число разных отправителей")
+    parser.add_argument("--secret", default=None)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.updates, args.concurrency, args.users, args.secret))
+
+
+if __name__ == "__main__":
+    main()
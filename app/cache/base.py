@@ -0,0 +1,51 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Iterable
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    invalidations: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0
+
+    def __str__(self):
+        return (
+            f"hits={self.hits}, misses={self.misses}, hit_ratio={self.hit_ratio:.1%}, "
+            f"invalidations={self.invalidations}"
+        )
+
+
+class CacheBackend(ABC):
+    """Кэш значений с тегами: invalidate(tag) удаляет все записи, сохраненные с этим тегом.
+
+    Интерфейс асинхронный, чтобы рядом с кэшем в памяти процесса можно было подключить Redis.
+
+    Чтение через кэш берет generation() до запроса к БД и передает его в set(): если тег записи был
+    сброшен после этого, значение могло устареть еще до сохранения и в кэш не попадает.
+    """
+
+    def __init__(self) -> None:
+        self.stats = CacheStats()
+
+    @abstractmethod
+    async def get(self, key: str) -> Any | None: ...
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, tags: Iterable[str] = (), generation: int | None = None) -> bool:
+        """Сохранить значение; False, если тег сброшен после generation и значение не сохранено."""
+
+    @abstractmethod
+    async def generation(self) -> int:
+        """Номер последней инвалидации."""
+
+    @abstractmethod
+    async def invalidate(self, *tags: str) -> None: ...
+
+    @abstractmethod
+    async def clear(self) -> None: ...
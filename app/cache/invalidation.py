@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import uuid
+from typing import Iterable
+
+import asyncpg
+
+from app.cache.base import CacheBackend
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "cache_invalidation"
+# источник изменений процесса: триггер добавляет его к тегу как "@<origin> <tag>", если он выставлен в
+# транзакции через set_config('app.cache_origin', ...), и слушатель того же процесса такие уведомления пропускает
+INSTANCE_ID = uuid.uuid4().hex
+
+
+class PostgresInvalidationListener:
+    """Сброс кэша по NOTIFY из Postgres.
+
+    Триггеры на products, user_products и fsm_states шлют в канал cache_invalidation теги вида product:<id>,
+    user:<id> и fsm:<key>, поэтому кэши всех реплик сбрасываются без опроса БД. Тег сбрасывается во всех
+    переданных кэшах, кроме изменений с источником origin: их процесс уже записал в кэш сам. Пока соединения
+    нет, уведомления теряются, так что после каждого (пере)подключения кэш очищается целиком.
+    """
+
+    def __init__(
+        self,
+        caches: Iterable[CacheBackend],
+        dsn: str,
+        channel: str = INVALIDATION_CHANNEL,
+        reconnect_delay: float = 5,
+        origin: str | None = INSTANCE_ID,
+    ) -> None:
+        self.caches = list(caches)
+        self.origin = origin
+        self.dsn = dsn
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+        self._task: asyncio.Task | None = None
+        self._pending: set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._listen()
+            except (OSError, asyncpg.PostgresError):
+                logger.exception("cache invalidation listener error")
+            await self._clear()
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def _listen(self) -> None:
+        """Слушать канал до разрыва соединения."""
+
+        connection = await asyncpg.connect(self.dsn)
+        try:
+            closed = asyncio.Event()
+            connection.add_termination_listener(lambda _: closed.set())
+            await connection.add_listener(self.channel, self._on_notification)
+            await self._clear()
+            logger.info("listening for cache invalidation on %s", self.channel)
+            await closed.wait()
+            logger.warning("cache invalidation connection lost")
+        finally:
+            if not connection.is_closed():
+                await connection.close()
+
+    def _on_notification(self, connection: asyncpg.Connection, pid: int, channel: str, payload: str) -> None:
+        origin = None
+        if payload.startswith("@"):
+            origin, _, payload = payload[1:].partition(" ")
+        if origin is not None and origin == self.origin:
+            return
+        task = asyncio.create_task(self._invalidate(payload))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _invalidate(self, tag: str) -> None:
+        for cache in self.caches:
+            await cache.invalidate(tag)
+
+    async def _clear(self) -> None:
+        for cache in self.caches:
+            await cache.clear()
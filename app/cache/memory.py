@@ -0,0 +1,110 @@
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Generic, Hashable, Iterable, KeysView, TypeVar
+
+from app.cache.base import CacheBackend
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """LRU-кэш в памяти процесса с ограниченным размером и временем жизни записей."""
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: K) -> V | None:
+        item = self._data.get(key)
+        if item is None:
+            return None
+
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: K, value: V) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def keys(self) -> KeysView[K]:
+        return self._data.keys()
+
+    def delete(self, key: K) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Кэш с тегами в памяти процесса поверх TTLCache.
+
+    Каждая инвалидация получает очередной номер, для тега запоминается номер последней. Номера старых
+    тегов забываются целиком: _floor считается инвалидацией всех тегов.
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 300) -> None:
+        super().__init__()
+        self._cache: TTLCache[str, tuple[Any, tuple[str, ...]]] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._tags: dict[str, set[str]] = defaultdict(set)
+        self._generation = 0
+        self._tag_generations: dict[str, int] = {}
+        self._floor = 0
+
+    async def get(self, key: str) -> Any | None:
+        item = self._cache.get(key)
+        if item is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return item[0]
+
+    async def set(self, key: str, value: Any, tags: Iterable[str] = (), generation: int | None = None) -> bool:
+        tags = tuple(tags)
+        if generation is not None and self._invalidated_since(generation, tags):
+            return False
+        self._cache.set(key, (value, tags))
+        for tag in tags:
+            self._tags[tag].add(key)
+        return True
+
+    async def generation(self) -> int:
+        return self._generation
+
+    async def invalidate(self, *tags: str) -> None:
+        self._generation += 1
+        for tag in tags:
+            self._tag_generations[tag] = self._generation
+            for key in self._tags.pop(tag, ()):
+                self._cache.delete(key)
+        self.stats.invalidations += 1
+        if len(self._tag_generations) > self._cache.maxsize:
+            self._forget_generations()
+        # вытесненные по размеру или сроку записи остаются в индексе тегов, чистим его вместе с кэшем
+        if len(self._tags) > self._cache.maxsize:
+            self._tags = defaultdict(set, {tag: keys for tag, keys in self._tags.items() if keys & self._cache.keys()})
+
+    async def clear(self) -> None:
+        self._generation += 1
+        self._forget_generations()
+        self._cache.clear()
+        self._tags.clear()
+
+    def _invalidated_since(self, generation: int, tags: tuple[str, ...]) -> bool:
+        return self._floor > generation or any(self._tag_generations.get(tag, 0) > generation for tag in tags)
+
+    def _forget_generations(self) -> None:
+        self._floor = self._generation
+        self._tag_generations.clear()
@@ -1,7 +1,8 @@
 from functools import lru_cache
+from typing import Literal
 
 from dotenv import find_dotenv
-from pydantic import Field, SecretStr
+from pydantic import Field, PositiveInt, SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -17,6 +18,30 @@ class TelegramConfig(BaseConfig):
     token: SecretStr
     admin_id: str
 
+    user_cache_size: int = 10_000
+    user_cache_ttl: int = 600  # секунд
+    history_page_size: int = 20
+    fsm_state_ttl: int = 60 * 60 * 24  # секунд, после которых брошенное состояние диалога удаляется
+    fsm_cache_size: int = 10_000
+    fsm_cache_ttl: int = 60  # секунд; записи других реплик сбрасываются по NOTIFY, 0 - без кэша
+    api_url: str | None = None  # свой сервер Bot API, например заглушка для нагрузочных тестов
+
+    notifications_rate: float = 30  # сообщений в секунду на весь бот
+    notifications_per_chat_interval: float = 1  # секунд между сообщениями в один чат
+    notifications_concurrency: int = 10
+
+    # polling - одна реплика; webhook - aiohttp-сервер, реплик может быть несколько за балансировщиком
+    mode: Literal["polling", "webhook"] = "polling"
+    webhook_url: str | None = None  # публичный адрес, например https://bot.example.com
+    webhook_path: str = "/webhook"
+    webhook_host: str = "0.0.0.0"  # noqa S104
+    webhook_port: int = 8080
+    webhook_secret: SecretStr | None = None
+    webhook_set_on_startup: bool = True
+    webhook_max_connections: int = 40  # одновременных запросов от Telegram
+    webhook_max_concurrency: int = 50  # обновлений в обработке на реплику
+    webhook_max_pending: int = 1000  # больше - отвечаем 503, Telegram повторит
+
 
 class DatabaseConfig(BaseConfig):
     model_config = SettingsConfigDict(env_prefix="postgres_")
@@ -26,18 +51,87 @@ class DatabaseConfig(BaseConfig):
     user: str
     password: SecretStr
     db: str
+    profile_queries: bool = False  # время запросов по методам DBClient и лог медленных запросов
+    slow_query_ms: int = 200
+    profile_report_size: int = 20  # самых тяжелых запросов в отчете при остановке
 
 
 class SchedulerConfig(BaseConfig):
     model_config = SettingsConfigDict(env_prefix="scheduler_")
 
+    enabled: bool = True  # при нескольких репликах бота включается только в одной
     run_interval: int = 30  # minutes
+    check_batch_size: int = 10  # товаров в одной задаче product.check
+    check_lease: int = 30  # минут, после которых не проверенный товар снова попадет в очередь
+    max_products_per_run: int = 1000
+    cleanup_interval: int = 60  # минут между удалениями товаров без подписчиков
+    cleanup_batch_size: PositiveInt = 500
+    price_history_retention_days: int = 365  # старше - сворачивается до min/max/last за день, 0 - хранить все
+    price_partitions_ahead: int = 3  # месяцев
 
 
 class ParserConfig(BaseConfig):
     model_config = SettingsConfigDict(env_prefix="parser_")
 
     headless_mode: bool
+    pages_pool_size: int = 4  # количество параллельных страниц при проверке цен
+    browser_recycle_interval: int = 60  # минут, после которых браузер пересоздается
+    browser_recycle_after_contexts: int = 500
+
+    # перехват запросов: тяжелые ресурсы не нужны, читаем только заголовок и цену
+    block_resources: bool = False
+    blocked_resource_types: list[str] = ["image", "media", "font"]
+    blocked_url_patterns: list[str] = [
+        r"google-analytics\.com",
+        r"googletagmanager\.com",
+        r"mc\.yandex\.",
+        r"connect\.facebook\.net",
+    ]
+    allowed_url_patterns: list[str] = []
+
+    # browser - только страница, api - API с откатом на страницу, shadow - страница + сравнение с API
+    fetch_mode: Literal["browser", "api", "shadow"] = "browser"
+    api_url: str = "https://api.uzum.uz/api/v2/product/{number}"
+    api_headers: dict[str, str] = {"Accept-Language": "ru-RU"}
+    api_timeout: float = 10  # секунд
+    api_pool_size: int = 10
+
+    # бюджет запросов к uzum.uz вместо случайных пауз: запросов в секунду и допустимый всплеск
+    rate_limit: float = 1
+    rate_limit_burst: int = 5
+    rate_limit_shared: bool = False  # общий бюджет для всех воркеров через Postgres
+
+
+class WorkerConfig(BaseConfig):
+    model_config = SettingsConfigDict(env_prefix="worker_")
+
+    concurrency: int = 1  # сообщений в обработке одновременно
+    max_retries: int = 4  # повторов с задержкой до отправки в DLQ
+    retry_base_delay: int = 30  # секунд, задержка удваивается с каждой попыткой
+    dedup_lease: int = 300  # секунд, повторные задачи на парсинг товара в этот срок пропускаются
+
+
+class OutboxConfig(BaseConfig):
+    model_config = SettingsConfigDict(env_prefix="outbox_")
+
+    batch_size: int = 100  # оповещений за одну транзакцию реле
+    poll_interval: float = 1  # секунд ожидания, когда outbox пуст
+
+
+class CacheConfig(BaseConfig):
+    model_config = SettingsConfigDict(env_prefix="cache_")
+
+    backend: Literal["memory", "none"] = "memory"
+    size: int = 10_000
+    ttl: int = 300  # секунд; изменения в БД сбрасывают кэш раньше через LISTEN/NOTIFY
+
+
+class MetricsConfig(BaseConfig):
+    model_config = SettingsConfigDict(env_prefix="metrics_")
+
+    enabled: bool = True
+    host: str = "0.0.0.0"  # noqa S104
+    port: int = 9100  # /metrics, /health/live, /health/ready
 
 
 class RabbitMQConfig(BaseConfig):
@@ -53,6 +147,14 @@ class RabbitMQConfig(BaseConfig):
     exchange_type: str = "direct"
     queue_product_add: str = "product.add"
     routing_key_product_add: str = "product.add"
+    queue_product_check: str = "product.check"
+    routing_key_product_check: str = "product.check"
+    queue_notification: str = "notification"
+    routing_key_notification: str = "notification"
+
+    publish_channel_pool_size: int = 4
+    publish_window: int = 256  # неподтвержденных сообщений в полете при publish_many
+    publish_retries: int = 3  # повторов сообщения, не подтвержденного из-за обрыва соединения
 
     @property
     def rabbitmq_uri(self) -> str:
@@ -65,8 +167,21 @@ class Config(BaseConfig):
     scheduler: SchedulerConfig = Field(default_factory=SchedulerConfig)
     parser: ParserConfig = Field(default_factory=ParserConfig)
     rabbitmq: RabbitMQConfig = Field(default_factory=RabbitMQConfig)
+    worker: WorkerConfig = Field(default_factory=WorkerConfig)
+    outbox: OutboxConfig = Field(default_factory=OutboxConfig)
+    cache: CacheConfig = Field(default_factory=CacheConfig)
+    metrics: MetricsConfig = Field(default_factory=MetricsConfig)
 
     min_check_interval: int = 60 * 8  # минут
+    max_check_interval: int = 60 * 24 * 3  # минут, для товаров без изменений цены
+    check_jitter: float = 0.2  # доля случайного сдвига времени проверки
+    volatility_window: int = 30  # дней истории цен для оценки волатильности
+
+    @property
+    def database_dsn(self) -> str:
+        """Адрес БД для asyncpg без SQLAlchemy, например для LISTEN."""
+
+        return self.database_uri.replace("postgresql+asyncpg://", "postgresql://", 1)
 
     @property
     def database_uri(self) -> str:
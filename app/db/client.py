@@ -1,10 +1,39 @@
 import contextlib
 import datetime
 import logging
+import re
 from asyncio import current_task
-from typing import AsyncGenerator, AsyncIterator, Iterable, Type, TypeVar
-
-from sqlalchemy import delete, select
+from collections import defaultdict
+from typing import TYPE_CHECKING, AsyncGenerator, AsyncIterator, Iterable, Type, TypeVar
+
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Date,
+    DateTime,
+    Float,
+    Integer,
+    Select,
+    String,
+    asc,
+    case,
+    cast,
+    column,
+    delete,
+    desc,
+    func,
+    insert,
+    literal,
+    null,
+    or_,
+    select,
+    text,
+    tuple_,
+    union_all,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import (
     AsyncConnection,
     AsyncEngine,
@@ -13,12 +42,30 @@ from sqlalchemy.ext.asyncio import (
     async_sessionmaker,
     create_async_engine,
 )
+from sqlalchemy.orm import load_only
 
 from app.db.base import Base, DatabaseSessionManagerInitError
-from app.db.models import Product, ProductPrice, User, user_product
+from app.db.models import (
+    PRICE_TYPE,
+    NotificationOutbox,
+    Product,
+    ProductPrice,
+    User,
+    fsm_state,
+    product_price_daily,
+    rate_limit,
+    user_product,
+)
+from app.db.profiling import QueryProfiler, track_caller
+from app.db.schemas import PriceHistoryItemSchema, PriceStatsSchema, ProductCheckStatsSchema
+
+if TYPE_CHECKING:
+    from app.db.schemas import ProductFetchResultSchema
 
 logger = logging.getLogger(__name__)
 
+PRICE_PARTITION_PATTERN = re.compile(r"productprices_(\d{4})_(\d{2})")
+
 
 T = TypeVar("T", bound=Base)
 
@@ -27,17 +74,25 @@ class DatabaseSessionManager:
     def __init__(self):
         self._engine: AsyncEngine | None = None
         self._session_maker: async_sessionmaker | None = None
+        self._profiler: QueryProfiler | None = None
 
-    def init(self, host: str):
+    def init(self, host: str, profiler: QueryProfiler | None = None):
         self._engine = create_async_engine(
             host, future=True, poolclass=None, connect_args={"server_settings": {"timezone": "UTC"}}
         )
+        if profiler:
+            profiler.attach(self._engine)
+        self._profiler = profiler
         self._session_maker = async_sessionmaker(
             bind=self._engine, autocommit=False, expire_on_commit=False, autoflush=False
         )
 
     async def close(self):
         await self._check_engine()
+        if self._profiler:
+            self._profiler.log_report()
+            self._profiler.detach(self._engine)
+            self._profiler = None
         await self._engine.dispose()
         self._engine = None
         self._session_maker = None
@@ -83,6 +138,7 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 
+@track_caller
 class DBClient:
     db_session: AsyncSession | None = None
 
@@ -103,11 +159,34 @@ class DBClient:
         result = await self.db_session.execute(select(User).filter_by(telegram_id=telegram_id, active=True))
         return result.scalar()
 
+    async def upsert_user(self, telegram_id: int, username: str | None) -> int:
+        """ID пользователя по telegram_id, новый пользователь создается тем же запросом."""
+
+        query = pg_insert(User).values(telegram_id=telegram_id, username=username)
+        query = query.on_conflict_do_update(
+            index_elements=[User.telegram_id],
+            set_={"username": query.excluded.username, "active": True},
+        ).returning(User.id)
+        user_id = (await self.db_session.execute(query)).scalar_one()
+        await self.db_session.commit()
+        return user_id
+
+    async def deactivate_users(self, telegram_ids: Iterable[int]) -> None:
+        """Пометить неактивными пользователей, заблокировавших бота."""
+
+        await self.db_session.execute(update(User).where(User.telegram_id.in_(list(telegram_ids))).values(active=False))
+        await self.db_session.commit()
+
     async def get_user_products(self, user_id: int) -> Iterable[Product]:
         """Список товара пользователя."""
 
-        query = select(Product).join(user_product, Product.id == user_product.c.product_id).filter_by(user_id=user_id)
-        result = (await self.db_session.execute(query)).unique()
+        query = (
+            select(Product)
+            .join(user_product, Product.id == user_product.c.product_id)
+            .filter_by(user_id=user_id)
+            .options(load_only(Product.id, Product.title, Product.url, Product.last_price))
+        )
+        result = await self.db_session.execute(query)
         return result.scalars().all()
 
     async def delete_user_product(self, user_id: int, product_id: int) -> None:
@@ -120,50 +199,292 @@ class DBClient:
         await self.db_session.commit()
 
     async def check_and_get_product(self, number: str, sku_id: str | None) -> Product | None:
-        result = await self.db_session.execute(select(Product).filter_by(number=number, sku_id=sku_id))
+        """Товар по номеру и варианту.
+
+        Строка блокируется FOR KEY SHARE до конца транзакции, чтобы удаление товаров без подписчиков не удалило
+        его до add_user_product: delete_orphan_products пропускает заблокированные строки, а если он успел
+        раньше, запрос дождется удаления и вернет None.
+        """
+
+        query = select(Product).filter_by(number=number, sku_id=sku_id).with_for_update(read=True, key_share=True)
+        result = await self.db_session.execute(query)
         return result.scalar()
 
-    async def create_and_add_product_to_user(self, user_id: int, url: str, number: str, sku_id: str | None) -> Product:
+    async def create_and_add_product_to_user(
+        self, user_id: int, url: str, number: str, sku_id: str | None, next_check_at: datetime.datetime | None = None
+    ) -> Product:
         product = Product(url=url, number=number, sku_id=sku_id)
-        user = await self.get_model_object_by_id(User, user_id)
-        user.products.append(product)
-        self.db_session.add(user)
+        if next_check_at:
+            product.next_check_at = next_check_at
+        self.db_session.add(product)
+        await self.db_session.flush()
+        await self.db_session.execute(insert(user_product).values(user_id=user_id, product_id=product.id))
 
         await self.db_session.commit()
         return product
 
     async def add_user_product(self, user_id: int, product_id: int) -> None:
-        self.db_session.add(user_product(user_id=user_id, product_id=product_id))
+        await self.db_session.execute(insert(user_product).values(user_id=user_id, product_id=product_id))
         await self.db_session.commit()
 
     async def update_product(self, product_id: int, **kwargs) -> None:
         await self.update_object(Product, product_id, **kwargs)
 
+    async def save_products_check(
+        self, products: Iterable["ProductFetchResultSchema"], next_checks: dict[int, datetime.datetime]
+    ) -> int:
+        """Сохранить результаты проверки пачки товаров одной транзакцией.
+
+        next_checks - время следующей проверки для каждого проверявшегося товара; товары без результата
+        считаются проверенными с ошибкой. Новые цены вставляются одним INSERT, товары обновляются одним
+        UPDATE ... FROM (VALUES ...). В той же транзакции подписчикам товаров с новой ценой пишутся
+        оповещения в notification_outbox. Возвращает число оповещений.
+        """
+
+        products_by_id = {product.id: product for product in products}
+        changed = [product for product in products_by_id.values() if product.new_price != product.price]
+        changed_ids = {product.id for product in changed}
+
+        if changed:
+            await self.db_session.execute(
+                insert(ProductPrice), [{"product_id": product.id, "price": product.new_price} for product in changed]
+            )
+
+        # для товаров без изменения цены last_price и title = NULL, т.е. остаются прежними
+        rows = []
+        for product_id, next_check_at in next_checks.items():
+            product = products_by_id.get(product_id)
+            is_changed = product_id in changed_ids
+            rows.append(
+                (
+                    product_id,
+                    product.new_price if is_changed else None,
+                    product.title if is_changed else None,
+                    product.checked_at if product else None,
+                    next_check_at,
+                    product is None,
+                )
+            )
+        checked = values(
+            column("id", Integer),
+            column("last_price", PRICE_TYPE),
+            column("title", String),
+            column("last_checked_at", DateTime(timezone=True)),
+            column("next_check_at", DateTime(timezone=True)),
+            column("failed", Boolean),
+            name="checked",
+        ).data(rows)
+        await self.db_session.execute(
+            update(Product)
+            .where(Product.id == checked.c.id)
+            .values(
+                # явное приведение: столбец из одних NULL в VALUES получает тип text
+                last_price=func.coalesce(cast(checked.c.last_price, PRICE_TYPE), Product.last_price),
+                title=func.coalesce(cast(checked.c.title, String), Product.title),
+                last_checked_at=func.coalesce(
+                    cast(checked.c.last_checked_at, DateTime(timezone=True)), Product.last_checked_at
+                ),
+                next_check_at=checked.c.next_check_at,
+                check_failures=case((checked.c.failed, Product.check_failures + 1), else_=0),
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+        notifications = []
+        if changed_ids:
+            user_products = defaultdict(list)
+            for telegram_id, product_id in await self.get_user_products_by_product_ids(changed_ids):
+                user_products[telegram_id].append(products_by_id[product_id].model_dump(mode="json"))
+            notifications = [
+                {"payload": {"telegram_id": telegram_id, "products": products}}
+                for telegram_id, products in user_products.items()
+            ]
+            if notifications:
+                await self.db_session.execute(insert(NotificationOutbox), notifications)
+        await self.db_session.commit()
+        return len(notifications)
+
+    async def get_products_check_stats(
+        self, product_ids: Iterable[int], since: datetime.datetime
+    ) -> list[ProductCheckStatsSchema]:
+        """Изменения цены с момента since, число подписчиков и ошибки проверки для расчета интервала проверки."""
+
+        product_ids = list(product_ids)
+        price_changes = (
+            select(ProductPrice.product_id, func.count().label("count"))
+            .where(ProductPrice.product_id.in_(product_ids), ProductPrice.created_at >= since)
+            .group_by(ProductPrice.product_id)
+            .subquery()
+        )
+        subscribers = (
+            select(user_product.c.product_id, func.count().label("count"))
+            .join(User, User.id == user_product.c.user_id)
+            .where(user_product.c.product_id.in_(product_ids), User.active)
+            .group_by(user_product.c.product_id)
+            .subquery()
+        )
+        query = (
+            select(
+                Product.id,
+                func.coalesce(price_changes.c.count, 0),
+                func.coalesce(subscribers.c.count, 0),
+                Product.check_failures,
+            )
+            .outerjoin(price_changes, price_changes.c.product_id == Product.id)
+            .outerjoin(subscribers, subscribers.c.product_id == Product.id)
+            .where(Product.id.in_(product_ids))
+        )
+        result = await self.db_session.execute(query)
+        return [
+            ProductCheckStatsSchema(
+                product_id=product_id, price_changes=changes, subscribers=subscribers_count, check_failures=failures
+            )
+            for product_id, changes, subscribers_count, failures in result.all()
+        ]
+
     async def get_user_products_by_product_ids(self, product_ids: Iterable[int]) -> Iterable[tuple[int, int]]:
         """Получить список пользователей, которые отслеживают цены на указанные продукты."""
 
         query = (
             select(User.telegram_id, user_product.c.product_id)
             .join(user_product, User.id == user_product.c.user_id)
-            .where(user_product.c.product_id.in_(product_ids))
+            .where(user_product.c.product_id.in_(product_ids), User.active)
             .distinct()
         )
 
         result = (await self.db_session.execute(query)).unique()
         return result.all()
 
+    async def lock_outbox_notifications(self, limit: int) -> list[tuple[int, dict]]:
+        """Пачка оповещений из outbox в порядке записи.
+
+        Строки заблокированы до конца транзакции, параллельные реле их пропускают (SKIP LOCKED).
+        """
+
+        query = (
+            select(NotificationOutbox.id, NotificationOutbox.payload)
+            .order_by(NotificationOutbox.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        return [(outbox_id, payload) for outbox_id, payload in await self.db_session.execute(query)]
+
+    async def delete_outbox_notifications(self, outbox_ids: Iterable[int]) -> None:
+        """Удалить опубликованные оповещения и снять блокировки."""
+
+        await self.db_session.execute(delete(NotificationOutbox).where(NotificationOutbox.id.in_(list(outbox_ids))))
+        await self.db_session.commit()
+
     async def get_all_user_products(self):
         return await self.db_session.execute(select(user_product))
 
     async def get_product_by_id(self, product_id: int) -> Type[Product]:
         return await self.get_model_object_by_id(Product, product_id)
 
-    async def get_product_with_prices(self, product_id: int) -> Product:
-        query = (
-            select(Product).join(ProductPrice, Product.id == ProductPrice.product_id).filter_by(product_id=product_id)
-        )
+    async def get_products_by_ids(self, product_ids: Iterable[int]) -> Iterable[Product]:
+        result = await self.db_session.execute(select(Product).where(Product.id.in_(product_ids)))
+        return result.scalars().all()
+
+    async def get_price_history(
+        self, product_id: int, limit: int, cursor: tuple[datetime.datetime, int] | None = None, older: bool = True
+    ) -> list[PriceHistoryItemSchema]:
+        """Страница истории цен по ключу (created_at, id) без OFFSET.
+
+        older=True - записи старше cursor от новых к старым, иначе записи новее cursor от старых к новым.
+        История старше срока хранения берется из productprices_daily: одна запись на день с id=0,
+        ценой на конец дня и min/max за день.
+        """
+
+        direction = desc if older else asc
+        raw, daily = self._price_history_sources(product_id, cursor, older)
+        raw = raw.order_by(direction(ProductPrice.created_at), direction(ProductPrice.id)).limit(limit)
+        daily = daily.order_by(direction(product_price_daily.c.day)).limit(limit)
+        history = union_all(raw, daily).subquery()
+        query = select(history).order_by(direction(history.c.created_at), direction(history.c.id)).limit(limit)
+
         result = await self.db_session.execute(query)
-        return result.scalar()
+        return [PriceHistoryItemSchema.model_validate(row, from_attributes=True) for row in result.all()]
+
+    async def has_price_history(self, product_id: int, cursor: tuple[datetime.datetime, int], older: bool) -> bool:
+        """Есть ли записи истории старше (older=True) или новее cursor."""
+
+        raw, daily = self._price_history_sources(product_id, cursor, older)
+        return (await self.db_session.execute(select(or_(raw.exists(), daily.exists())))).scalar_one()
+
+    async def get_price_stats(self, product_id: int, periods: Iterable[int]) -> list[PriceStatsSchema]:
+        """Минимальная, максимальная и средняя цена за каждый период в днях одним запросом.
+
+        Для дней, свернутых в productprices_daily, берутся min/max за день, а в среднее день входит
+        одной ценой на конец дня.
+        """
+
+        periods = sorted(periods)
+        now = func.now()
+        since = now - datetime.timedelta(days=periods[-1])
+        raw = select(
+            ProductPrice.created_at,
+            ProductPrice.price.label("min_price"),
+            ProductPrice.price.label("max_price"),
+            ProductPrice.price,
+        ).where(ProductPrice.product_id == product_id, ProductPrice.created_at >= since)
+        daily = select(
+            self._daily_created_at(),
+            product_price_daily.c.min_price,
+            product_price_daily.c.max_price,
+            product_price_daily.c.last_price,
+        ).where(product_price_daily.c.product_id == product_id, product_price_daily.c.day >= cast(since, Date))
+        samples = union_all(raw, daily).subquery()
+
+        columns = []
+        for days in periods:
+            in_period = samples.c.created_at >= now - datetime.timedelta(days=days)
+            columns.extend(
+                [
+                    func.min(samples.c.min_price).filter(in_period),
+                    func.max(samples.c.max_price).filter(in_period),
+                    cast(func.avg(samples.c.price).filter(in_period), PRICE_TYPE),
+                ]
+            )
+        row = (await self.db_session.execute(select(*columns))).one()
+        return [
+            PriceStatsSchema(days=days, min_price=row[i * 3], max_price=row[i * 3 + 1], avg_price=row[i * 3 + 2])
+            for i, days in enumerate(periods)
+        ]
+
+    @staticmethod
+    def _daily_created_at():
+        return cast(product_price_daily.c.day, DateTime(timezone=True)).label("created_at")
+
+    def _price_history_sources(
+        self, product_id: int, cursor: tuple[datetime.datetime, int] | None, older: bool
+    ) -> tuple[Select, Select]:
+        """Запросы к сырой и свернутой по дням истории с общими колонками, отфильтрованные по cursor."""
+
+        raw = select(
+            ProductPrice.id,
+            ProductPrice.price,
+            ProductPrice.created_at,
+            cast(null(), PRICE_TYPE).label("min_price"),
+            cast(null(), PRICE_TYPE).label("max_price"),
+        ).where(ProductPrice.product_id == product_id)
+        daily_created_at = self._daily_created_at()
+        daily = select(
+            literal(0, BigInteger).label("id"),
+            product_price_daily.c.last_price.label("price"),
+            daily_created_at,
+            product_price_daily.c.min_price,
+            product_price_daily.c.max_price,
+        ).where(product_price_daily.c.product_id == product_id)
+        if cursor:
+            raw_key = tuple_(ProductPrice.created_at, ProductPrice.id)
+            daily_key = tuple_(daily_created_at.element, literal(0, BigInteger))
+            if older:
+                raw = raw.where(raw_key < tuple_(*cursor))
+                daily = daily.where(daily_key < tuple_(*cursor))
+            else:
+                raw = raw.where(raw_key > tuple_(*cursor))
+                daily = daily.where(daily_key > tuple_(*cursor))
+        return raw, daily
 
     async def get_model_object_by_id(self, model: Type[T], obj_id: int) -> Type[T]:
         result = await self.db_session.execute(select(model).filter_by(id=obj_id))
@@ -173,16 +494,236 @@ class DBClient:
         result = (await self.db_session.execute(select(model).filter_by(**kwargs))).unique()
         return result.scalars().all()
 
-    async def get_products_to_check(self, time_to_check: datetime.datetime) -> Iterable[Product]:
-        result = (
+    async def count_due_products(self) -> int:
+        """Сколько товаров пора проверить."""
+
+        query = select(func.count()).where(
+            ~Product.deleted, Product.next_check_at <= func.now(), self._has_active_subscribers()
+        )
+        return (await self.db_session.execute(query)).scalar_one()
+
+    async def ping(self) -> bool:
+        await self.db_session.execute(select(1))
+        return True
+
+    async def claim_products_to_check(self, limit: int, lease: datetime.timedelta) -> list[int]:
+        """Атомарно забрать товары, которые пора проверить, начиная с самых давних.
+
+        Забранные товары сдвигаются на срок аренды, поэтому параллельные планировщики получают
+        непересекающиеся пачки, а при падении проверяющего товар вернется в очередь после окончания аренды.
+        """
+
+        due = (
+            select(Product.id)
+            .where(~Product.deleted, Product.next_check_at <= func.now(), self._has_active_subscribers())
+            .order_by(Product.next_check_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        query = (
+            update(Product)
+            .where(Product.id.in_(due.scalar_subquery()))
+            .values(next_check_at=func.now() + lease)
+            .returning(Product.id)
+            .execution_options(synchronize_session=False)
+        )
+        product_ids = (await self.db_session.execute(query)).scalars().all()
+        await self.db_session.commit()
+        return list(product_ids)
+
+    async def claim_scrape_leases(self, product_ids: Iterable[int], lease: datetime.timedelta) -> list[int]:
+        """Атомарно взять аренду на парсинг товаров.
+
+        Возвращает товары, аренда которых свободна или истекла; остальные сейчас парсит другой воркер
+        или спарсили меньше lease назад. Аренда не снимается после парсинга и закрывает повторы.
+        """
+
+        query = (
+            update(Product)
+            .where(
+                Product.id.in_(list(product_ids)),
+                or_(Product.scrape_lease_until.is_(None), Product.scrape_lease_until <= func.now()),
+            )
+            .values(scrape_lease_until=func.now() + lease)
+            .returning(Product.id)
+            .execution_options(synchronize_session=False)
+        )
+        claimed = (await self.db_session.execute(query)).scalars().all()
+        await self.db_session.commit()
+        return list(claimed)
+
+    async def release_scrape_leases(self, product_ids: Iterable[int]) -> None:
+        """Снять аренду, например после ошибки парсинга, чтобы повтор не был принят за дубликат."""
+
+        await self.db_session.execute(
+            update(Product)
+            .where(Product.id.in_(list(product_ids)))
+            .values(scrape_lease_until=None)
+            .execution_options(synchronize_session=False)
+        )
+        await self.db_session.commit()
+
+    async def take_rate_limit_tokens(self, key: str, rate: float, capacity: float, tokens: float = 1) -> float:
+        """Пополнить bucket key по прошедшему времени и списать tokens одним запросом.
+
+        Возвращает остаток; отрицательный остаток - токены взяты в долг.
+        """
+
+        now = func.clock_timestamp()
+        refilled = func.least(
+            capacity, rate_limit.c.tokens + cast(func.extract("epoch", now - rate_limit.c.updated_at), Float) * rate
+        )
+        query = pg_insert(rate_limit).values(key=key, tokens=capacity - tokens, updated_at=now)
+        query = query.on_conflict_do_update(
+            index_elements=[rate_limit.c.key], set_={"tokens": refilled - tokens, "updated_at": now}
+        ).returning(rate_limit.c.tokens)
+        balance = (await self.db_session.execute(query)).scalar_one()
+        await self.db_session.commit()
+        return balance
+
+    async def get_fsm_record(self, key: str) -> tuple[str | None, dict] | None:
+        """Состояние и данные FSM по ключу, если они не истекли."""
+
+        query = select(fsm_state.c.state, fsm_state.c.data).where(
+            fsm_state.c.key == key, fsm_state.c.expires_at > func.now()
+        )
+        row = (await self.db_session.execute(query)).first()
+        return (row.state, row.data) if row else None
+
+    async def upsert_fsm_record(
+        self, key: str, ttl: datetime.timedelta, origin: str | None = None, **values
+    ) -> tuple[str | None, dict]:
+        """Записать state и/или data и продлить срок жизни записи; возвращает запись целиком.
+
+        Если у записи не осталось ни состояния, ни данных, она удаляется. origin попадает в NOTIFY триггера,
+        чтобы слушатель процесса-писателя не сбрасывал только что записанное значение.
+        """
+
+        if origin:
+            await self.db_session.execute(select(func.set_config("app.cache_origin", origin, True)))
+
+        # у истекшей записи прежние значения не учитываются
+        expired = fsm_state.c.expires_at <= func.now()
+        query = pg_insert(fsm_state).values(key=key, expires_at=func.now() + ttl, **values)
+        query = query.on_conflict_do_update(
+            index_elements=[fsm_state.c.key],
+            set_={
+                "state": query.excluded.state if "state" in values else case((expired, None), else_=fsm_state.c.state),
+                "data": (
+                    query.excluded.data
+                    if "data" in values
+                    else case((expired, text("'{}'::jsonb")), else_=fsm_state.c.data)
+                ),
+                "expires_at": query.excluded.expires_at,
+            },
+        ).returning(fsm_state.c.state, fsm_state.c.data)
+        row = (await self.db_session.execute(query)).one()
+        if row.state is None and not row.data:
+            await self.db_session.execute(delete(fsm_state).where(fsm_state.c.key == key))
+        await self.db_session.commit()
+        return row.state, row.data
+
+    async def delete_expired_fsm_records(self) -> int:
+        result = await self.db_session.execute(delete(fsm_state).where(fsm_state.c.expires_at <= func.now()))
+        await self.db_session.commit()
+        return result.rowcount
+
+    async def delete_orphan_products(self, limit: int) -> int:
+        """Удалить пачку товаров без подписчиков вместе с историей цен."""
+
+        orphans = (
+            select(Product.id)
+            .where(~select(user_product.c.product_id).where(user_product.c.product_id == Product.id).exists())
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        product_ids = (await self.db_session.execute(orphans)).scalars().all()
+        if product_ids:
+            await self.db_session.execute(delete(ProductPrice).where(ProductPrice.product_id.in_(product_ids)))
             await self.db_session.execute(
-                select(Product)
-                .where((Product.last_checked_at.is_(None)) | (Product.last_checked_at < time_to_check))
-                .limit(100)
-                .order_by(Product.last_checked_at.is_(None), Product.last_checked_at.desc())
+                delete(product_price_daily).where(product_price_daily.c.product_id.in_(product_ids))
             )
-        ).unique()
-        return result.scalars().all()
+            await self.db_session.execute(delete(Product).where(Product.id.in_(product_ids)))
+        await self.db_session.commit()
+        return len(product_ids)
+
+    async def create_price_partitions(self, months_ahead: int) -> None:
+        """Создать помесячные секции истории цен с текущего месяца на months_ahead вперед."""
+
+        await self.db_session.execute(
+            text(
+                "SELECT create_productprices_partition("
+                "(date_trunc('month', now()) + make_interval(months => m))::date"
+                ") FROM generate_series(0, :months_ahead) AS m"
+            ),
+            {"months_ahead": months_ahead},
+        )
+        await self.db_session.commit()
+
+    async def downsample_price_history(self, before: datetime.date) -> list[str]:
+        """Свернуть по дням и удалить помесячные секции истории цен, целиком лежащие до before.
+
+        Строки до before в секции по умолчанию (месяцы, для которых секцию не создали вовремя) сворачиваются
+        и удаляются так же.
+        """
+
+        result = await self.db_session.execute(
+            text(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE pg_inherits.inhparent = 'productprices'::regclass"
+            )
+        )
+        expired = []
+        for partition in result.scalars():
+            match = PRICE_PARTITION_PATTERN.fullmatch(partition)
+            if not match:
+                continue
+            year, month = int(match.group(1)), int(match.group(2))
+            partition_end = datetime.date(year + month // 12, month % 12 + 1, 1)
+            if partition_end <= before:
+                expired.append(partition)
+
+        for partition in sorted(expired):
+            # имя секции проверено шаблоном, поэтому его можно подставить в запрос
+            await self._downsample_prices(partition)
+            await self.db_session.execute(text(f"DROP TABLE {partition}"))
+            await self.db_session.commit()
+            logger.info("price history partition %s downsampled", partition)
+
+        default_expired = "productprices_default WHERE created_at < :before"
+        await self._downsample_prices(default_expired, {"before": before})
+        result = await self.db_session.execute(text(f"DELETE FROM {default_expired}"), {"before": before})
+        await self.db_session.commit()
+        if result.rowcount:
+            logger.info("%s price history rows in productprices_default downsampled", result.rowcount)
+            expired.append("productprices_default")
+        return expired
+
+    async def _downsample_prices(self, source: str, params: dict | None = None) -> None:
+        """Добавить в productprices_daily дневные min/max/последнюю цену строк из source."""
+
+        await self.db_session.execute(
+            text(
+                f"INSERT INTO productprices_daily (product_id, day, min_price, max_price, last_price) "
+                f"SELECT product_id, created_at::date, min(price), max(price), "
+                f"(array_agg(price ORDER BY created_at DESC))[1] "
+                f"FROM {source} GROUP BY product_id, created_at::date "
+                f"ON CONFLICT (product_id, day) DO UPDATE SET "
+                f"min_price = least(productprices_daily.min_price, excluded.min_price), "
+                f"max_price = greatest(productprices_daily.max_price, excluded.max_price), "
+                f"last_price = excluded.last_price"
+            ),
+            params,
+        )
+
+    def _has_active_subscribers(self):
+        return (
+            select(user_product.c.product_id)
+            .join(User, User.id == user_product.c.user_id)
+            .where(user_product.c.product_id == Product.id, User.active)
+            .exists()
+        )
 
     async def create_object(self, model: Type[Base], **kwargs) -> Base:
         obj = model(**kwargs)
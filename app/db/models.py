@@ -1,27 +1,48 @@
 from datetime import datetime
 
-from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Table, UniqueConstraint, text
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Date,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Numeric,
+    String,
+    Table,
+    UniqueConstraint,
+    func,
+    text,
+)
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base, CreatedAtModelMixin, TimeStampModelMixin
 
+# цены храним точно, но в коде работаем с float
+PRICE_TYPE = Numeric(14, 2, asdecimal=False)
+
 user_product = Table(
     "user_products",
     Base.metadata,
     Column("user_id", ForeignKey("users.id"), primary_key=True),
     Column("product_id", ForeignKey("products.id"), primary_key=True),
     UniqueConstraint("user_id", "product_id", name="unique_user_product"),
+    # первичный ключ начинается с user_id, для поиска подписчиков товара нужен свой индекс
+    Index("ix_user_products_product_id", "product_id"),
 )
 
 
 class User(Base, TimeStampModelMixin):
     """Пользователь."""
 
-    telegram_id: Mapped[int] = mapped_column(BigInteger)
+    telegram_id: Mapped[int] = mapped_column(BigInteger, unique=True, index=True)
     username: Mapped[str | None]
     active: Mapped[bool] = mapped_column(default=True, server_default=text("'true'"))
 
-    products: Mapped[list["Product"]] = relationship(secondary=user_product, back_populates="users", lazy="joined")
+    # стратегия загрузки задается в каждом запросе через options(), неявная загрузка запрещена
+    products: Mapped[list["Product"]] = relationship(secondary=user_product, back_populates="users", lazy="raise")
 
     def __str__(self):
         return f"User {self.telegram_id}"
@@ -38,15 +59,23 @@ class Product(Base, TimeStampModelMixin):
     deleted: Mapped[bool] = mapped_column(default=False, server_default=text("'false'"))
     number: Mapped[str]
     sku_id: Mapped[str | None]
-    last_price: Mapped[float | None]
+    last_price: Mapped[float | None] = mapped_column(PRICE_TYPE)
     last_checked_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    # время следующей проверки; на время проверки сдвигается на срок аренды, см. DBClient.claim_products_to_check
+    next_check_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    check_failures: Mapped[int] = mapped_column(default=0, server_default=text("0"))  # ошибок проверки подряд
+    # товар парсится воркером или только что спарсен, см. DBClient.claim_scrape_leases
+    scrape_lease_until: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
 
-    users: Mapped[list["User"]] = relationship(secondary=user_product, back_populates="products")
+    users: Mapped[list["User"]] = relationship(secondary=user_product, back_populates="products", lazy="raise")
     prices: Mapped[list["ProductPrice"]] = relationship(
-        "ProductPrice", back_populates="product", lazy="joined", order_by="-ProductPrice.id"
+        "ProductPrice", back_populates="product", lazy="raise", order_by="-ProductPrice.id"
     )
 
-    __table_args__ = (UniqueConstraint("number", "sku_id", name="unique_product"),)
+    __table_args__ = (
+        UniqueConstraint("number", "sku_id", name="unique_product"),
+        Index("ix_products_next_check_at", "next_check_at", postgresql_where=text("NOT deleted")),
+    )
 
     def __str__(self):
         title = self.title or self.url
@@ -57,12 +86,71 @@ class Product(Base, TimeStampModelMixin):
 
 
 class ProductPrice(Base, CreatedAtModelMixin):
-    """Цена товара."""
+    """Цена товара.
+
+    Таблица секционирована помесячно по created_at, секции создает DBClient.create_price_partitions.
+    """
 
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
     product_id: Mapped[int] = mapped_column(ForeignKey("products.id"))
-    price: Mapped[float | None]
+    price: Mapped[float | None] = mapped_column(PRICE_TYPE)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), primary_key=True)
 
-    product: Mapped["Product"] = relationship("Product", back_populates="prices")
+    product: Mapped["Product"] = relationship("Product", back_populates="prices", lazy="raise")
+
+    __table_args__ = (
+        Index("ix_productprices_product_id_created_at", "product_id", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
     def __repr__(self):
         return f"<ProductPrice(id='{self.id}')>"
+
+
+# история цен старше срока хранения, свернутая по дням
+product_price_daily = Table(
+    "productprices_daily",
+    Base.metadata,
+    Column("product_id", ForeignKey("products.id"), primary_key=True),
+    Column("day", Date, primary_key=True),
+    Column("min_price", PRICE_TYPE),
+    Column("max_price", PRICE_TYPE),
+    Column("last_price", PRICE_TYPE),
+)
+
+
+# состояние token bucket'ов, общих для нескольких процессов, см. PostgresTokenBucket
+rate_limit = Table(
+    "rate_limits",
+    Base.metadata,
+    Column("key", String, primary_key=True),
+    Column("tokens", Float, nullable=False),
+    Column("updated_at", DateTime(timezone=True), nullable=False),
+)
+
+
+# состояния FSM бота, см. PostgresStorage; брошенные состояния удаляются после expires_at
+fsm_state = Table(
+    "fsm_states",
+    Base.metadata,
+    Column("key", String, primary_key=True),
+    Column("state", String, nullable=True),
+    Column("data", JSONB, nullable=False, server_default=text("'{}'::jsonb")),
+    Column("expires_at", DateTime(timezone=True), nullable=False),
+    Index("ix_fsm_states_expires_at", "expires_at"),
+)
+
+
+class NotificationOutbox(Base, CreatedAtModelMixin):
+    """Оповещение пользователя, ожидающее публикации в очередь notification.
+
+    Пишется в той же транзакции, что и новые цены, в RabbitMQ переносится OutboxRelay.
+    """
+
+    __tablename__ = "notification_outbox"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    payload: Mapped[dict] = mapped_column(JSONB)
+
+    def __repr__(self):
+        return f"<NotificationOutbox(id='{self.id}')>"
@@ -0,0 +1,170 @@
+import contextvars
+import dataclasses
+import functools
+import inspect
+import logging
+import re
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, ExceptionContext
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.metrics.metrics import DB_QUERY_SECONDS
+
+if TYPE_CHECKING:
+    from app.config.settings import DatabaseConfig
+
+logger = logging.getLogger(__name__)
+
+C = TypeVar("C", bound=type)
+
+# метод DBClient, из которого выполняется запрос; SQLAlchemy переносит контекст в greenlet движка
+current_caller: contextvars.ContextVar[str] = contextvars.ContextVar("db_current_caller", default="-")
+# счетчик запросов текущего апдейта Telegram, выставляется QueryProfilingMiddleware
+current_update_stats: contextvars.ContextVar["UpdateQueryStats | None"] = contextvars.ContextVar(
+    "db_current_update_stats", default=None
+)
+
+# приведения типов asyncpg: $1::INTEGER, $2::NUMERIC(14, 2), $3::TIMESTAMP WITH TIME ZONE, $4::VARCHAR[]
+PLACEHOLDER_PATTERN = re.compile(r"\$\d+(?:::\w+(?:\(\d+(?:,\s*\d+)?\))?(?: WITH(?:OUT)? TIME ZONE)?(?:\[\])*)?")
+PLACEHOLDER_LIST_PATTERN = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+ROWS_LIST_PATTERN = re.compile(r"VALUES \(\?\)(?:\s*,\s*\(\?\))*")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=1024)
+def normalize_sql(statement: str) -> str:
+    """SQL без значений параметров: списки IN и строки VALUES любой длины сводятся к одному виду."""
+
+    statement = WHITESPACE_PATTERN.sub(" ", statement).strip()
+    statement = PLACEHOLDER_PATTERN.sub("?", statement)
+    statement = PLACEHOLDER_LIST_PATTERN.sub("(?)", statement)
+    return ROWS_LIST_PATTERN.sub("VALUES (?), ...", statement)
+
+
+def track_caller(cls: C) -> C:
+    """Декоратор класса: публичные корутины выполняются с именем метода в current_caller."""
+
+    def wrap(name: str, method: Callable) -> Callable:
+        @functools.wraps(method)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            token = current_caller.set(name)
+            try:
+                return await method(*args, **kwargs)
+            finally:
+                current_caller.reset(token)
+
+        return wrapper
+
+    for name, method in list(vars(cls).items()):
+        if not name.startswith("_") and inspect.iscoroutinefunction(method):
+            setattr(cls, name, wrap(f"{cls.__name__}.{name}", method))
+    return cls
+
+
+@dataclasses.dataclass
+class StatementStats:
+    count: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+    rows: int = 0
+
+    def add(self, elapsed: float, rows: int) -> None:
+        self.count += 1
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+        self.rows += rows
+
+
+@dataclasses.dataclass
+class UpdateQueryStats:
+    queries: int = 0
+    total_time: float = 0.0
+
+
+def create_profiler(config: "DatabaseConfig") -> "QueryProfiler | None":
+    if not config.profile_queries:
+        return None
+    return QueryProfiler(config.slow_query_ms / 1000, config.profile_report_size)
+
+
+class QueryProfiler:
+    """Профилирование запросов через события движка SQLAlchemy.
+
+    Время и число строк каждого запроса суммируются по паре (нормализованный SQL, метод DBClient),
+    запросы дольше slow_query_threshold пишутся в лог с параметрами.
+    """
+
+    def __init__(self, slow_query_threshold: float = 0.1, report_size: int = 20) -> None:
+        self.slow_query_threshold = slow_query_threshold  # секунд
+        self.report_size = report_size
+        self.stats: dict[tuple[str, str], StatementStats] = {}
+        self._lock = threading.Lock()
+
+    def attach(self, engine: AsyncEngine) -> None:
+        event.listen(engine.sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine.sync_engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(engine.sync_engine, "handle_error", self._handle_error)
+
+    def detach(self, engine: AsyncEngine) -> None:
+        event.remove(engine.sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.remove(engine.sync_engine, "after_cursor_execute", self._after_cursor_execute)
+        event.remove(engine.sync_engine, "handle_error", self._handle_error)
+
+    def report(self) -> list[str]:
+        """Самые тяжелые запросы по суммарному времени."""
+
+        with self._lock:
+            items = sorted(self.stats.items(), key=lambda item: item[1].total_time, reverse=True)
+        return [
+            f"{stats.total_time * 1000:.1f}ms total, {stats.count} calls, "
+            f"{stats.total_time / stats.count * 1000:.1f}ms avg, {stats.max_time * 1000:.1f}ms max, "
+            f"{stats.rows} rows [{caller}] {statement}"
+            for (statement, caller), stats in items[: self.report_size]
+        ]
+
+    def log_report(self) -> None:
+        for line in self.report():
+            logger.info("query profile: %s", line)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stats.clear()
+
+    def _before_cursor_execute(self, conn: Connection, cursor, statement, parameters, context, executemany) -> None:
+        # стек на случай вложенных запросов в одном соединении
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn: Connection, cursor, statement, parameters, context, executemany) -> None:
+        elapsed = time.perf_counter() - conn.info["query_started_at"].pop()
+        rows = max(cursor.rowcount, 0)
+        caller = current_caller.get()
+
+        key = (normalize_sql(statement), caller)
+        with self._lock:
+            if (stats := self.stats.get(key)) is None:
+                stats = self.stats[key] = StatementStats()
+            stats.add(elapsed, rows)
+        DB_QUERY_SECONDS.labels(caller=caller).observe(elapsed)
+
+        if (update_stats := current_update_stats.get()) is not None:
+            update_stats.queries += 1
+            update_stats.total_time += elapsed
+
+        if elapsed >= self.slow_query_threshold:
+            logger.warning(
+                "slow query %.1fms, %s rows [%s]: %s; params=%.500r",
+                elapsed * 1000,
+                rows,
+                caller,
+                WHITESPACE_PATTERN.sub(" ", statement),
+                parameters,
+            )
+
+    def _handle_error(self, context: ExceptionContext) -> None:
+        # after_cursor_execute для упавшего запроса не вызывается
+        if context.connection is not None and context.connection.info.get("query_started_at"):
+            context.connection.info["query_started_at"].pop()
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import TypedDict
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 
 class UserProductSchema(TypedDict):
@@ -18,6 +18,47 @@ class ProductFetchResultSchema(BaseModel):
     url: str
 
 
+class ProductListItemSchema(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    title: str | None
+    url: str
+    last_price: float | None
+
+
 class ProductMinifiedSchema(BaseModel):
     title: str
     price: float
+
+
+class ProductCheckStatsSchema(BaseModel):
+    product_id: int
+    price_changes: int
+    subscribers: int
+    check_failures: int
+
+
+class PriceHistoryItemSchema(BaseModel):
+    id: int  # 0 - запись за день из productprices_daily
+    price: float | None
+    created_at: datetime
+    min_price: float | None = None  # только у записей за день
+    max_price: float | None = None
+
+
+class PriceStatsSchema(BaseModel):
+    days: int
+    min_price: float | None
+    max_price: float | None
+    avg_price: float | None
+
+
+class PriceHistoryPageSchema(BaseModel):
+    product_id: int
+    title: str | None
+    current_price: float | None
+    stats: list[PriceStatsSchema]
+    items: list[PriceHistoryItemSchema]  # от новых к старым
+    has_newer: bool
+    has_older: bool
@@ -5,18 +5,33 @@ from logging import getLogger
 from app.bot.uzum_bot import UzumBot
 from app.config.logging import LOGGING
 from app.config.settings import app_config
-from app.db.client import sessionmanager
+from app.db.client import DBClient, sessionmanager
+from app.db.profiling import create_profiler
+from app.metrics.server import MetricsServer
 
 logging_config.dictConfig(LOGGING)
 logger = getLogger(__name__)
 
 
+async def check_db() -> bool:
+    async with DBClient() as db_client:
+        return await db_client.ping()
+
+
 async def main():
+    metrics_server = None
     try:
-        sessionmanager.init(app_config.database_uri)
+        sessionmanager.init(app_config.database_uri, create_profiler(app_config.db))
         bot = UzumBot()
+        if app_config.metrics.enabled:
+            metrics_server = MetricsServer(app_config.metrics.host, app_config.metrics.port)
+            metrics_server.add_readiness_check("db", check_db)
+            metrics_server.add_readiness_check("rabbitmq", bot.is_connected_to_rabbitmq)
+            await metrics_server.start()
         await bot.run()
     finally:
+        if metrics_server:
+            await metrics_server.stop()
         await sessionmanager.close()
 
 
@@ -0,0 +1,64 @@
+from typing import TYPE_CHECKING
+
+from app.metrics.registry import REGISTRY, CallbackCounter, Counter, Gauge, Histogram
+
+if TYPE_CHECKING:
+    from app.cache.base import CacheStats
+
+PAGE_LOAD_SECONDS = Histogram("uzum_page_load_seconds", "Загрузка страницы товара")
+PARSE_SECONDS = Histogram("uzum_parse_seconds", "Разбор названия и цены со страницы")
+API_FETCH_SECONDS = Histogram("uzum_api_fetch_seconds", "Запрос товара через API")
+DB_WRITE_SECONDS = Histogram("uzum_db_write_seconds", "Запись результатов в БД", ("operation",))
+DB_QUERY_SECONDS = Histogram("uzum_db_query_seconds", "Запросы к БД по методам DBClient", ("caller",))
+NOTIFICATION_SEND_SECONDS = Histogram("uzum_notification_send_seconds", "Отправка оповещения в Telegram")
+CHECK_WAVE_SECONDS = Histogram(
+    "uzum_check_wave_seconds", "Постановка волны задач на проверку цен", buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300)
+)
+
+SCRAPES = Counter("uzum_scrapes", "Попытки получить цену товара", ("source", "result"))
+FAILURES = Counter("uzum_failures", "Ошибки по видам", ("kind",))
+NOTIFICATIONS = Counter("uzum_notifications", "Оповещения по результату отправки", ("result",))
+PRODUCTS_QUEUED = Counter("uzum_products_queued", "Товаров поставлено на проверку")
+MESSAGES_PROCESSED = Counter(
+    "uzum_messages_processed", "Сообщения RabbitMQ, обработанные воркером", ("queue", "result")
+)
+# читаются из CacheStats при сборе, см. register_cache_stats
+CACHE_REQUESTS = CallbackCounter("uzum_cache_requests", "Обращения к кэшу по результату", ("cache", "result"))
+CACHE_INVALIDATIONS = CallbackCounter("uzum_cache_invalidations", "Вызовы инвалидации кэша", ("cache",))
+
+BROWSER_CONTEXTS = Gauge("uzum_browser_contexts", "Открытые контексты браузера")
+DUE_PRODUCTS = Gauge("uzum_due_products", "Товаров, которые пора проверить, но еще не забраны")
+QUEUE_DEPTH = Gauge("uzum_queue_depth", "Сообщений в очереди RabbitMQ", ("queue",))
+
+for metric in (
+    PAGE_LOAD_SECONDS,
+    PARSE_SECONDS,
+    API_FETCH_SECONDS,
+    DB_WRITE_SECONDS,
+    DB_QUERY_SECONDS,
+    NOTIFICATION_SEND_SECONDS,
+    CHECK_WAVE_SECONDS,
+    SCRAPES,
+    FAILURES,
+    NOTIFICATIONS,
+    PRODUCTS_QUEUED,
+    MESSAGES_PROCESSED,
+    CACHE_REQUESTS,
+    CACHE_INVALIDATIONS,
+    BROWSER_CONTEXTS,
+    DUE_PRODUCTS,
+    QUEUE_DEPTH,
+):
+    REGISTRY.register(metric)
+
+
+def register_cache_stats(cache: str, stats: "CacheStats") -> None:
+    """Публиковать попадания, промахи и инвалидации кэша с меткой cache."""
+
+    CACHE_REQUESTS.set_callback(cache, lambda: {(cache, "hit"): stats.hits, (cache, "miss"): stats.misses})
+    CACHE_INVALIDATIONS.set_callback(cache, lambda: {(cache,): stats.invalidations})
+
+
+def unregister_cache_stats(cache: str) -> None:
+    CACHE_REQUESTS.remove_callback(cache)
+    CACHE_INVALIDATIONS.remove_callback(cache)
@@ -0,0 +1,67 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+from aiohttp import web
+
+from app.metrics.registry import REGISTRY, Registry
+
+logger = logging.getLogger(__name__)
+
+ReadinessCheck = Callable[[], Awaitable[bool]]
+
+
+class MetricsServer:
+    """HTTP-эндпоинт процесса: /metrics в формате Prometheus, /health/live и /health/ready.
+
+    live отвечает, пока жив цикл событий; ready - когда все проверки готовности (БД, RabbitMQ, браузер)
+    проходят за timeout.
+    """
+
+    def __init__(
+        self,
+        host: str = "0.0.0.0",  # noqa S104
+        port: int = 9100,
+        registry: Registry = REGISTRY,
+        timeout: float = 3,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.registry = registry
+        self.timeout = timeout
+        self.readiness_checks: dict[str, ReadinessCheck] = {}
+        self._runner: web.AppRunner | None = None
+
+    def add_readiness_check(self, name: str, check: ReadinessCheck) -> None:
+        self.readiness_checks[name] = check
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/metrics", self.metrics)
+        app.router.add_get("/health/live", self.live)
+        app.router.add_get("/health/ready", self.ready)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info("metrics on %s:%s", self.host, self.port)
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+
+    async def metrics(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.registry.render(), content_type="text/plain", charset="utf-8")
+
+    async def live(self, request: web.Request) -> web.Response:
+        return web.json_response({"status": "ok"})
+
+    async def ready(self, request: web.Request) -> web.Response:
+        results = {}
+        for name, check in self.readiness_checks.items():
+            try:
+                results[name] = await asyncio.wait_for(check(), self.timeout)
+            except Exception:
+                logger.exception("readiness check %s failed", name)
+                results[name] = False
+        status = 200 if all(results.values()) else 503
+        return web.json_response(results, status=status)
@@ -0,0 +1,49 @@
+"""unique index on users.telegram_id
+
+Revision ID: 3a9d51c7e2b4
+Revises: f06c6588eba0
+Create Date: 2026-10-17 10:12:41.508317
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3a9d51c7e2b4"
+down_revision: Union[str, None] = "f06c6588eba0"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # дубликаты telegram_id сливаем в пользователя с минимальным id
+    op.execute(
+        """
+            INSERT INTO user_products (user_id, product_id)
+            SELECT keep.id, user_products.product_id
+            FROM user_products
+            JOIN users ON users.id = user_products.user_id
+            JOIN (SELECT telegram_id, min(id) AS id FROM users GROUP BY telegram_id) keep
+                ON keep.telegram_id = users.telegram_id AND keep.id <> users.id
+            ON CONFLICT DO NOTHING
+        """
+    )
+    op.execute(
+        """
+            DELETE FROM user_products
+            WHERE user_id IN (
+                SELECT id FROM users
+                WHERE id NOT IN (SELECT min(id) FROM users GROUP BY telegram_id)
+            )
+        """
+    )
+    op.execute("DELETE FROM users WHERE id NOT IN (SELECT min(id) FROM users GROUP BY telegram_id)")
+    op.create_index(op.f("ix_users_telegram_id"), "users", ["telegram_id"], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_users_telegram_id"), table_name="users")
@@ -0,0 +1,57 @@
+"""fsm states cache invalidation trigger
+
+Revision ID: 4d8b2f6e1a93
+Revises: 9e4c1d7b5a28
+Create Date: 2026-10-17 20:12:47.508316
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "4d8b2f6e1a93"
+down_revision: Union[str, None] = "9e4c1d7b5a28"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # реплики бота сбрасывают закэшированное состояние диалога по тегу fsm:<key>, см. PostgresStorage;
+    # с источником "@<origin> fsm:<key>" уведомление пропускает реплика, сделавшая запись
+    op.execute(
+        """
+        CREATE FUNCTION notify_fsm_state_invalidation() RETURNS trigger AS $$
+        DECLARE
+            origin text := current_setting('app.cache_origin', true);
+            tag text;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                tag := 'fsm:' || OLD.key;
+            ELSE
+                tag := 'fsm:' || NEW.key;
+            END IF;
+            IF origin IS NOT NULL AND origin <> '' THEN
+                tag := '@' || origin || ' ' || tag;
+            END IF;
+            PERFORM pg_notify('cache_invalidation', tag);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER fsm_states_cache_invalidation
+        AFTER INSERT OR UPDATE OR DELETE ON fsm_states
+        FOR EACH ROW EXECUTE FUNCTION notify_fsm_state_invalidation()
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER fsm_states_cache_invalidation ON fsm_states")
+    op.execute("DROP FUNCTION notify_fsm_state_invalidation()")
@@ -0,0 +1,47 @@
+"""add next_check_at column to products
+
+Revision ID: 9c4e27b81f05
+Revises: 3a9d51c7e2b4
+Create Date: 2026-10-17 11:03:18.274590
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9c4e27b81f05"
+down_revision: Union[str, None] = "3a9d51c7e2b4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "products",
+        sa.Column("next_check_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+    )
+    # MIN_CHECK_INTERVAL по умолчанию - 8 часов
+    op.execute(
+        """
+            UPDATE products
+            SET next_check_at = last_checked_at + interval '8 hours'
+            WHERE last_checked_at IS NOT NULL
+        """
+    )
+    op.create_index(
+        "ix_products_next_check_at",
+        "products",
+        ["next_check_at"],
+        unique=False,
+        postgresql_where=sa.text("NOT deleted"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_products_next_check_at", table_name="products", postgresql_where=sa.text("NOT deleted"))
+    op.drop_column("products", "next_check_at")
@@ -0,0 +1,79 @@
+"""cache invalidation triggers
+
+Revision ID: 9e4c1d7b5a28
+Revises: 7f9a3b62d1e0
+Create Date: 2026-10-17 18:40:19.275031
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9e4c1d7b5a28"
+down_revision: Union[str, None] = "7f9a3b62d1e0"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # NOTIFY с тегом кэша, см. app.cache.invalidation; одинаковые уведомления в транзакции Postgres склеивает
+    op.execute(
+        """
+        CREATE FUNCTION notify_cache_invalidation() RETURNS trigger AS $$
+        DECLARE
+            rec record;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                rec := OLD;
+            ELSE
+                rec := NEW;
+            END IF;
+            IF TG_TABLE_NAME = 'user_products' THEN
+                PERFORM pg_notify('cache_invalidation', 'user:' || rec.user_id);
+            ELSE
+                PERFORM pg_notify('cache_invalidation', 'product:' || rec.id);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER user_products_cache_invalidation
+        AFTER INSERT OR DELETE ON user_products
+        FOR EACH ROW EXECUTE FUNCTION notify_cache_invalidation()
+        """
+    )
+    # проверка обновляет next_check_at у каждого товара, уведомляем только о видимых пользователю изменениях
+    op.execute(
+        """
+        CREATE TRIGGER products_cache_invalidation
+        AFTER UPDATE OF last_price, title, deleted ON products
+        FOR EACH ROW
+        WHEN (
+            OLD.last_price IS DISTINCT FROM NEW.last_price
+            OR OLD.title IS DISTINCT FROM NEW.title
+            OR OLD.deleted IS DISTINCT FROM NEW.deleted
+        )
+        EXECUTE FUNCTION notify_cache_invalidation()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER products_delete_cache_invalidation
+        AFTER DELETE ON products
+        FOR EACH ROW EXECUTE FUNCTION notify_cache_invalidation()
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER products_delete_cache_invalidation ON products")
+    op.execute("DROP TRIGGER products_cache_invalidation ON products")
+    op.execute("DROP TRIGGER user_products_cache_invalidation ON user_products")
+    op.execute("DROP FUNCTION notify_cache_invalidation()")
@@ -0,0 +1,155 @@
+"""partitioned productprices with numeric prices and daily history
+
+Revision ID: e62b9f0d3a71
+Revises: d17a6c2f94e8
+Create Date: 2026-10-17 13:05:52.640731
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e62b9f0d3a71"
+down_revision: Union[str, None] = "d17a6c2f94e8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PRICE_TYPE = sa.Numeric(14, 2)
+
+# строки месяца, попавшие в productprices_default, пока секции не было, переносятся в новую секцию:
+# иначе ее нельзя подключить, пока в секции по умолчанию есть строки из ее диапазона
+CREATE_PARTITION_FUNCTION = """
+    CREATE OR REPLACE FUNCTION create_productprices_partition(month date) RETURNS void AS $$
+    DECLARE
+        start_date date := date_trunc('month', month);
+        end_date date := start_date + interval '1 month';
+        partition_name text := 'productprices_' || to_char(start_date, 'YYYY_MM');
+    BEGIN
+        IF to_regclass(partition_name) IS NOT NULL THEN
+            RETURN;
+        END IF;
+        IF to_regclass('productprices_default') IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF productprices FOR VALUES FROM (%L) TO (%L)',
+                partition_name,
+                start_date,
+                end_date
+            );
+            RETURN;
+        END IF;
+        EXECUTE format('CREATE TABLE %I (LIKE productprices INCLUDING DEFAULTS)', partition_name);
+        EXECUTE format(
+            'WITH moved AS ('
+            '    DELETE FROM productprices_default WHERE created_at >= %L AND created_at < %L RETURNING *'
+            ') INSERT INTO %I SELECT * FROM moved',
+            start_date,
+            end_date,
+            partition_name
+        );
+        EXECUTE format(
+            'ALTER TABLE productprices ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+            partition_name,
+            start_date,
+            end_date
+        );
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("ALTER TABLE productprices RENAME TO productprices_old")
+    op.execute("ALTER TABLE productprices_old RENAME CONSTRAINT productprices_pkey TO productprices_old_pkey")
+    op.execute(
+        "ALTER TABLE productprices_old RENAME CONSTRAINT productprices_product_id_fkey TO productprices_old_product_id_fkey"
+    )
+    op.execute("ALTER SEQUENCE productprices_id_seq OWNED BY NONE")
+    # serial создавал последовательность AS integer, она закончилась бы на 2^31 раньше столбца
+    op.execute("ALTER SEQUENCE productprices_id_seq AS bigint")
+
+    op.execute(
+        """
+            CREATE TABLE productprices (
+                id BIGINT NOT NULL DEFAULT nextval('productprices_id_seq'),
+                product_id INTEGER NOT NULL REFERENCES products (id),
+                price NUMERIC(14, 2),
+                created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+                CONSTRAINT productprices_pkey PRIMARY KEY (id, created_at)
+            ) PARTITION BY RANGE (created_at)
+        """
+    )
+    op.execute("ALTER SEQUENCE productprices_id_seq OWNED BY productprices.id")
+    op.create_index("ix_productprices_product_id_created_at", "productprices", ["product_id", "created_at"])
+    op.execute(CREATE_PARTITION_FUNCTION)
+    op.execute(
+        """
+            SELECT create_productprices_partition(month::date)
+            FROM generate_series(
+                date_trunc('month', coalesce((SELECT min(created_at) FROM productprices_old), now())),
+                date_trunc('month', now()) + interval '3 months',
+                interval '1 month'
+            ) AS month
+        """
+    )
+    op.execute("CREATE TABLE productprices_default PARTITION OF productprices DEFAULT")
+    op.execute(
+        """
+            INSERT INTO productprices (id, product_id, price, created_at)
+            SELECT id, product_id, price, created_at FROM productprices_old
+        """
+    )
+    op.drop_table("productprices_old")
+
+    op.create_table(
+        "productprices_daily",
+        sa.Column("product_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("min_price", PRICE_TYPE, nullable=True),
+        sa.Column("max_price", PRICE_TYPE, nullable=True),
+        sa.Column("last_price", PRICE_TYPE, nullable=True),
+        sa.ForeignKeyConstraint(
+            ["product_id"],
+            ["products.id"],
+        ),
+        sa.PrimaryKeyConstraint("product_id", "day"),
+    )
+    op.alter_column("products", "last_price", existing_type=sa.Float(), type_=PRICE_TYPE, existing_nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column("products", "last_price", existing_type=PRICE_TYPE, type_=sa.Float(), existing_nullable=True)
+    op.drop_table("productprices_daily")
+
+    op.execute("ALTER TABLE productprices RENAME TO productprices_partitioned")
+    op.execute(
+        "ALTER TABLE productprices_partitioned RENAME CONSTRAINT productprices_pkey TO productprices_partitioned_pkey"
+    )
+    op.execute("ALTER SEQUENCE productprices_id_seq OWNED BY NONE")
+    op.execute(
+        """
+            CREATE TABLE productprices (
+                id INTEGER NOT NULL DEFAULT nextval('productprices_id_seq'),
+                product_id INTEGER NOT NULL,
+                price DOUBLE PRECISION,
+                created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+                CONSTRAINT productprices_pkey PRIMARY KEY (id),
+                -- у секций остаются ограничения с этим именем, автоматически выбралось бы ..._fkey1
+                CONSTRAINT productprices_product_id_fkey FOREIGN KEY (product_id) REFERENCES products (id)
+            )
+        """
+    )
+    op.execute("ALTER SEQUENCE productprices_id_seq OWNED BY productprices.id")
+    op.execute("ALTER SEQUENCE productprices_id_seq AS integer")
+    op.execute(
+        """
+            INSERT INTO productprices (id, product_id, price, created_at)
+            SELECT id, product_id, price, created_at FROM productprices_partitioned
+        """
+    )
+    op.execute("DROP TABLE productprices_partitioned CASCADE")
+    op.execute("DROP FUNCTION create_productprices_partition(date)")
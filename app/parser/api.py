@@ -0,0 +1,101 @@
+import logging
+import re
+from typing import TYPE_CHECKING, Any
+from urllib.parse import parse_qs, urlparse
+
+import aiohttp
+
+from app.db.schemas import ProductMinifiedSchema
+
+if TYPE_CHECKING:
+    from app.ratelimit.postgres import PostgresTokenBucket
+    from app.ratelimit.token_bucket import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_NUMBER_PATTERN = re.compile(r"/product/.*?-([\d\-]+)(?:\?|$)")
+
+
+class ApiFetchError(Exception):
+    """Быстрый путь не смог получить корректные данные о товаре."""
+
+
+def parse_product_url(url: str) -> tuple[str, str | None]:
+    """Номер товара и skuId из ссылки на товар."""
+
+    parsed_url = urlparse(url)
+    match = PRODUCT_NUMBER_PATTERN.search(parsed_url.path)
+    if not match:
+        raise ApiFetchError(f"cannot find product number in {url!r}")
+    sku_id = parse_qs(parsed_url.query).get("skuId")
+    return match.group(1), sku_id[0] if sku_id else None
+
+
+class UzumApiFetcher:
+    """Получение названия и цены товара через API Узум без рендеринга страницы."""
+
+    session: aiohttp.ClientSession | None = None
+
+    def __init__(
+        self,
+        api_url: str,
+        headers: dict[str, str],
+        timeout: float = 10,
+        pool_size: int = 10,
+        rate_limiter: "TokenBucket | PostgresTokenBucket | None" = None,
+    ) -> None:
+        self.api_url = api_url
+        self.headers = headers
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.rate_limiter = rate_limiter
+
+    async def start(self) -> None:
+        # одна сессия с keep-alive соединениями на все запросы процесса
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60),
+            headers=self.headers,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            raise_for_status=True,
+        )
+
+    async def close(self) -> None:
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+    async def fetch_product(self, number: str, sku_id: str | None) -> ProductMinifiedSchema:
+        if self.session is None:
+            raise ApiFetchError("UzumApiFetcher not started")
+
+        if self.rate_limiter:
+            await self.rate_limiter.acquire()
+        try:
+            async with self.session.get(self.api_url.format(number=number)) as response:
+                payload = await response.json(content_type=None)
+        except (aiohttp.ClientError, TimeoutError, ValueError) as exc:
+            raise ApiFetchError(f"request for product {number} failed: {exc!r}") from exc
+
+        return self._parse_payload(payload, number, sku_id)
+
+    def _parse_payload(self, payload: Any, number: str, sku_id: str | None) -> ProductMinifiedSchema:
+        try:
+            data = payload["payload"]["data"]
+            title = (data.get("title") or "").strip()
+            sku_list = data["skuList"]
+        except (KeyError, TypeError) as exc:
+            raise ApiFetchError(f"unexpected payload for product {number}") from exc
+
+        if sku_id:
+            skus = [sku for sku in sku_list if str(sku.get("id")) == str(sku_id)]
+        else:
+            skus = sku_list
+        # без skuId страница показывает вариант по умолчанию - по API его не определить
+        if len(skus) != 1:
+            raise ApiFetchError(f"ambiguous sku for product {number}, sku_id={sku_id}: {len(skus)} found")
+
+        price = skus[0].get("purchasePrice")
+        if not title or not isinstance(price, (int, float)) or price <= 0:
+            raise ApiFetchError(f"inconsistent data for product {number}: title={title!r}, price={price!r}")
+
+        return ProductMinifiedSchema(title=title, price=float(price))
@@ -0,0 +1,106 @@
+import asyncio
+import contextlib
+import datetime
+import logging
+from typing import AsyncIterator
+
+from playwright.async_api import Browser, BrowserContext, Playwright, async_playwright
+
+from app.metrics.metrics import BROWSER_CONTEXTS
+
+logger = logging.getLogger(__name__)
+
+BROWSER_ARGS = ["--start-maximized", "--disable-blink-features=AutomationControlled"]
+
+
+class BrowserManager:
+    """Долгоживущий Chromium: проверка перед выдачей, перезапуск при падении и периодическое пересоздание.
+
+    Старый экземпляр при пересоздании закрывается, только когда закрыты все выданные из него контексты.
+    """
+
+    def __init__(self, headless: bool = True, recycle_interval: int = 60, recycle_after_contexts: int = 500) -> None:
+        self.headless = headless
+        self.recycle_interval = datetime.timedelta(minutes=recycle_interval)
+        self.recycle_after_contexts = recycle_after_contexts
+
+        self._playwright: Playwright | None = None
+        self._browser: Browser | None = None
+        self._launched_at: datetime.datetime | None = None
+        self._contexts_served = 0
+        self._open_contexts: dict[Browser, int] = {}
+        self._lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        async with self._lock:
+            await self._get_browser()
+
+    async def close(self) -> None:
+        async with self._lock:
+            for browser in {*self._open_contexts, self._browser} - {None}:
+                await self._close_browser(browser)
+            self._open_contexts.clear()
+            self._browser = None
+            if self._playwright:
+                await self._playwright.stop()
+                self._playwright = None
+
+    @contextlib.asynccontextmanager
+    async def new_context(self) -> AsyncIterator[BrowserContext]:
+        async with self._lock:
+            browser = await self._get_browser()
+            self._contexts_served += 1
+            self._open_contexts[browser] = self._open_contexts.get(browser, 0) + 1
+
+        BROWSER_CONTEXTS.inc()
+        try:
+            context = await browser.new_context(no_viewport=True)
+            try:
+                yield context
+            finally:
+                with contextlib.suppress(Exception):
+                    await context.close()
+        finally:
+            BROWSER_CONTEXTS.dec()
+            self._open_contexts[browser] -= 1
+            if not self._open_contexts[browser] and browser is not self._browser:
+                del self._open_contexts[browser]
+                await self._close_browser(browser)
+
+    def is_ready(self) -> bool:
+        return self._browser is not None and self._browser.is_connected()
+
+    async def _get_browser(self) -> Browser:
+        if self._browser is not None and not self._browser.is_connected():
+            logger.warning("browser disconnected, relaunching")
+            await self._retire_browser()
+        elif self._browser is not None and self._needs_recycle():
+            logger.info("recycling browser after %s contexts", self._contexts_served)
+            await self._retire_browser()
+
+        if self._browser is None:
+            await self._launch()
+        return self._browser
+
+    def _needs_recycle(self) -> bool:
+        age = datetime.datetime.now(datetime.UTC) - self._launched_at
+        return age > self.recycle_interval or self._contexts_served >= self.recycle_after_contexts
+
+    async def _retire_browser(self) -> None:
+        browser, self._browser = self._browser, None
+        # занятый браузер закроет последний освободившийся контекст
+        if not self._open_contexts.get(browser):
+            self._open_contexts.pop(browser, None)
+            await self._close_browser(browser)
+
+    async def _launch(self) -> None:
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(args=BROWSER_ARGS, headless=self.headless)
+        self._launched_at = datetime.datetime.now(datetime.UTC)
+        self._contexts_served = 0
+        logger.info("browser launched")
+
+    async def _close_browser(self, browser: Browser) -> None:
+        with contextlib.suppress(Exception):
+            await browser.close()
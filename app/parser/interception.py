@@ -0,0 +1,73 @@
+import logging
+import re
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterable
+
+if TYPE_CHECKING:
+    from playwright.async_api import BrowserContext, Page, Request, Route
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TrafficStats:
+    """Статистика трафика за один прогон парсера."""
+
+    requests: int = 0
+    aborted: int = 0
+    bytes_transferred: int = 0
+
+    def __str__(self):
+        return f"requests={self.requests}, aborted={self.aborted}, bytes={self.bytes_transferred}"
+
+
+class RequestInterceptor:
+    """Перехват запросов страницы: отбрасывает тяжелые ресурсы и считает трафик.
+
+    Разрешающие шаблоны имеют приоритет над запрещающими и над типами ресурсов.
+    """
+
+    def __init__(
+        self,
+        block: bool,
+        resource_types: Iterable[str] = (),
+        deny_patterns: Iterable[str] = (),
+        allow_patterns: Iterable[str] = (),
+    ) -> None:
+        self.block = block
+        self.resource_types = frozenset(resource_types)
+        self.deny_patterns = [re.compile(pattern) for pattern in deny_patterns]
+        self.allow_patterns = [re.compile(pattern) for pattern in allow_patterns]
+        self.stats = TrafficStats()
+
+    async def attach(self, target: "Page | BrowserContext") -> None:
+        """Подключить перехват к странице или контексту браузера."""
+
+        if self.block:
+            await target.route("**/*", self._handle_route)
+        target.on("requestfinished", self._on_request_finished)
+
+    def is_blocked(self, url: str, resource_type: str) -> bool:
+        if any(pattern.search(url) for pattern in self.allow_patterns):
+            return False
+        if resource_type in self.resource_types:
+            return True
+        return any(pattern.search(url) for pattern in self.deny_patterns)
+
+    async def _handle_route(self, route: "Route") -> None:
+        request = route.request
+        if self.is_blocked(request.url, request.resource_type):
+            self.stats.aborted += 1
+            await route.abort()
+            return
+        await route.continue_()
+
+    async def _on_request_finished(self, request: "Request") -> None:
+        self.stats.requests += 1
+        try:
+            sizes = await request.sizes()
+        except Exception:
+            # страница могла закрыться раньше, чем мы успели получить размеры
+            logger.debug("cannot get sizes for %s", request.url)
+            return
+        self.stats.bytes_transferred += sizes["responseHeadersSize"] + max(sizes["responseBodySize"], 0)
@@ -1,23 +1,110 @@
+import asyncio
 import datetime
 import logging
-import random
 import re
-from asyncio import sleep
-from typing import Iterable
+from typing import TYPE_CHECKING, Iterable
 
-from playwright.async_api import Page, async_playwright, expect
+from playwright.async_api import Page, expect
 
 from app.db.models import Product
 from app.db.schemas import ProductFetchResultSchema, ProductMinifiedSchema
+from app.metrics.metrics import API_FETCH_SECONDS, PAGE_LOAD_SECONDS, PARSE_SECONDS, SCRAPES
+from app.parser.api import ApiFetchError, UzumApiFetcher, parse_product_url
+from app.parser.browser import BrowserManager
+from app.parser.interception import RequestInterceptor
+from app.ratelimit.postgres import PostgresTokenBucket
+from app.ratelimit.token_bucket import TokenBucket
+
+if TYPE_CHECKING:
+    from app.config.settings import ParserConfig
 
 logger = logging.getLogger(__name__)
 
+FETCH_MODE_BROWSER = "browser"
+FETCH_MODE_API = "api"  # API с откатом на браузер
+FETCH_MODE_SHADOW = "shadow"  # браузер, API только для сравнения
+
 
 class UzumParser:
     """Парсер Узум."""
 
-    def __init__(self, headless: bool = True):
+    def __init__(
+        self,
+        headless: bool = True,
+        pages_pool_size: int = 1,
+        block_resources: bool = False,
+        blocked_resource_types: Iterable[str] = (),
+        blocked_url_patterns: Iterable[str] = (),
+        allowed_url_patterns: Iterable[str] = (),
+        fetch_mode: str = FETCH_MODE_BROWSER,
+        api_fetcher: UzumApiFetcher | None = None,
+        browser_manager: BrowserManager | None = None,
+        rate_limiter: TokenBucket | PostgresTokenBucket | None = None,
+    ):
+        if fetch_mode != FETCH_MODE_BROWSER and api_fetcher is None:
+            raise ValueError(f"api_fetcher is required for fetch_mode={fetch_mode!r}")
+
         self.headless = headless
+        self.pages_pool_size = max(pages_pool_size, 1)
+        self.block_resources = block_resources
+        self.blocked_resource_types = tuple(blocked_resource_types)
+        self.blocked_url_patterns = tuple(blocked_url_patterns)
+        self.allowed_url_patterns = tuple(allowed_url_patterns)
+        self.fetch_mode = fetch_mode
+        self.api_fetcher = api_fetcher
+        self.browser_manager = browser_manager or BrowserManager(headless=headless)
+        # общий бюджет запросов к uzum.uz на все страницы процесса (или всех процессов)
+        self.rate_limiter = rate_limiter or TokenBucket(1, 5)
+
+    @classmethod
+    def from_config(cls, config: "ParserConfig") -> "UzumParser":
+        if config.rate_limit_shared:
+            rate_limiter = PostgresTokenBucket("uzum.uz", config.rate_limit, config.rate_limit_burst)
+        else:
+            rate_limiter = TokenBucket(config.rate_limit, config.rate_limit_burst)
+
+        return cls(
+            headless=config.headless_mode,
+            pages_pool_size=config.pages_pool_size,
+            block_resources=config.block_resources,
+            blocked_resource_types=config.blocked_resource_types,
+            blocked_url_patterns=config.blocked_url_patterns,
+            allowed_url_patterns=config.allowed_url_patterns,
+            fetch_mode=config.fetch_mode,
+            api_fetcher=(
+                UzumApiFetcher(
+                    config.api_url, config.api_headers, config.api_timeout, config.api_pool_size, rate_limiter
+                )
+                if config.fetch_mode != FETCH_MODE_BROWSER
+                else None
+            ),
+            browser_manager=BrowserManager(
+                headless=config.headless_mode,
+                recycle_interval=config.browser_recycle_interval,
+                recycle_after_contexts=config.browser_recycle_after_contexts,
+            ),
+            rate_limiter=rate_limiter,
+        )
+
+    async def start(self) -> None:
+        await self.browser_manager.start()
+        if self.api_fetcher:
+            await self.api_fetcher.start()
+
+    async def close(self) -> None:
+        if self.api_fetcher:
+            await self.api_fetcher.close()
+        await self.browser_manager.close()
+
+    def create_interceptor(self) -> RequestInterceptor:
+        """Новый перехватчик запросов со своей статистикой на один прогон."""
+
+        return RequestInterceptor(
+            block=self.block_resources,
+            resource_types=self.blocked_resource_types,
+            deny_patterns=self.blocked_url_patterns,
+            allow_patterns=self.allowed_url_patterns,
+        )
 
     async def parse_product_title(self, page: Page) -> str:
         locator = page.locator("[data-test-id='text__product-name']")
@@ -33,64 +120,191 @@ class UzumParser:
         logger.debug("found raw price text: %s", price)
         return price
 
+    async def fetch_product(self, url: str) -> ProductMinifiedSchema:
+        """Получение товара с учетом режима: API, страница или оба со сравнением."""
+
+        api_product = None
+        if self.fetch_mode != FETCH_MODE_BROWSER:
+            api_product = await self._fetch_product_via_api(url)
+            if api_product and self.fetch_mode == FETCH_MODE_API:
+                return api_product
+
+        async with self.browser_manager.new_context() as context:
+            page = await context.new_page()
+            product = await self.fetch_product_with_page(page, url)
+
+        if self.fetch_mode == FETCH_MODE_SHADOW:
+            self._compare_with_api(url, product.title, product.price, api_product)
+        return product
+
     async def fetch_product_with_page(self, page: Page, url: str) -> ProductMinifiedSchema:
         logger.debug("parsing product started")
-        await page.goto(url, wait_until="load")
-        await page.wait_for_timeout(random.uniform(2000, 5000))
-        locator = page.get_by_role("button", name="Добавить в корзину")
-        await expect(locator).to_be_visible()
-
+        interceptor = self.create_interceptor()
+        await interceptor.attach(page)
+        await self.rate_limiter.acquire()
         try:  # noqa WPS229
-            product_title = await self.parse_product_title(page=page)
-            raw_price = await self.parse_product_price(page=page)
-            product_price = self._parse_price_to_float(raw_price)
+            with PAGE_LOAD_SECONDS.time():
+                await page.goto(url, wait_until="load")
+                locator = page.get_by_role("button", name="Добавить в корзину")
+                await expect(locator).to_be_visible()
+
+            with PARSE_SECONDS.time():
+                product_title = await self.parse_product_title(page=page)
+                raw_price = await self.parse_product_price(page=page)
+                product_price = self._parse_price_to_float(raw_price)
+            SCRAPES.labels(source="browser", result="ok").inc()
             return ProductMinifiedSchema(title=product_title, price=product_price)
         except Exception:
+            SCRAPES.labels(source="browser", result="failed").inc()
             logger.exception("error loading %s", url)
             raise
         finally:
-            await sleep(random.uniform(1, 4))
+            logger.info("traffic for %s: %s", url, interceptor.stats)
 
     async def fetch_products_updates(self, products: Iterable[Product]) -> list[ProductFetchResultSchema]:
+        products = list(products)
+        if self.fetch_mode == FETCH_MODE_BROWSER:
+            return await self._fetch_products_with_browser(products)
+
+        api_results = await asyncio.gather(*(self._fetch_product_update_via_api(product) for product in products))
+
+        if self.fetch_mode == FETCH_MODE_SHADOW:
+            result = await self._fetch_products_with_browser(products)
+            api_by_id = {item.id: item for item in api_results if item}
+            for item in result:
+                api_item = api_by_id.get(item.id)
+                self._compare_with_api(
+                    item.url,
+                    item.title,
+                    item.new_price,
+                    api_item and ProductMinifiedSchema(title=api_item.title, price=api_item.new_price),
+                )
+            return result
+
+        result = [item for item in api_results if item]
+        fallback = [product for product, item in zip(products, api_results, strict=True) if not item]
+        logger.info("api fetched %s products, %s fall back to browser", len(result), len(fallback))
+        if fallback:
+            result.extend(await self._fetch_products_with_browser(fallback))
+        return result
+
+    async def _fetch_products_with_browser(self, products: Iterable[Product]) -> list[ProductFetchResultSchema]:
+        """Проверка цен пулом страниц, которые разбирают товары из общей ограниченной очереди."""
+
         result: list[ProductFetchResultSchema] = []
+        queue: asyncio.Queue[Product | None] = asyncio.Queue(maxsize=self.pages_pool_size * 2)
+        interceptor = self.create_interceptor()
 
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(
-                args=["--start-maximized", "--disable-blink-features=AutomationControlled"], headless=self.headless
-            )
-            context = await browser.new_context(no_viewport=True)
-            page = await context.new_page()
-            try:
-                logger.debug("parsing products started")
-                for product in products:
-                    await page.goto(product.url, wait_until="load")
-                    await page.wait_for_timeout(random.uniform(1000, 2000))
-
-                    try:  # noqa WPS229
-                        current_price = await self.parse_product_price(page=page)
-                        new_price = self._parse_price_to_float(current_price)
-                        parsed_product = ProductFetchResultSchema(
-                            id=product.id,
-                            price=product.last_price,
-                            new_price=new_price,
-                            title=product.title,
-                            url=product.url,
-                            checked_at=datetime.datetime.now(datetime.UTC),
-                        )
-                        if not product.title:
-                            parsed_product.title = await self.parse_product_title(page=page)
-                        result.append(parsed_product)
+        logger.debug("parsing products started, pool size %s", self.pages_pool_size)
+        workers = [
+            asyncio.create_task(self._page_worker(queue, interceptor, result)) for _ in range(self.pages_pool_size)
+        ]
+        try:
+            for product in products:
+                await queue.put(product)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+        logger.info("parsing products finished, traffic: %s", interceptor.stats)
+        return result
+
+    async def fetch_product_update(self, page: Page, product: Product) -> ProductFetchResultSchema:
+        """Получение текущей цены (и заголовка, если его нет) для уже сохраненного товара."""
 
+        await self.rate_limiter.acquire()
+        try:
+            with PAGE_LOAD_SECONDS.time():
+                await page.goto(product.url, wait_until="load")
+            with PARSE_SECONDS.time():
+                current_price = await self.parse_product_price(page=page)
+                new_price = self._parse_price_to_float(current_price)
+                title = product.title or await self.parse_product_title(page=page)
+        except Exception:
+            SCRAPES.labels(source="browser", result="failed").inc()
+            raise
+
+        SCRAPES.labels(source="browser", result="ok").inc()
+        return ProductFetchResultSchema(
+            id=product.id,
+            price=product.last_price,
+            new_price=new_price,
+            title=title,
+            url=product.url,
+            checked_at=datetime.datetime.now(datetime.UTC),
+        )
+
+    async def _page_worker(
+        self,
+        queue: "asyncio.Queue[Product | None]",
+        interceptor: RequestInterceptor,
+        result: list[ProductFetchResultSchema],
+    ) -> None:
+        try:
+            async with self.browser_manager.new_context() as context:
+                await interceptor.attach(context)
+                page: Page | None = None
+                while (product := await queue.get()) is not None:
+                    try:
+                        page = page or await context.new_page()
+                        result.append(await self.fetch_product_update(page, product))
                     except Exception:
                         logger.exception("error loading %s", product.url)
-                    finally:
-                        await sleep(random.uniform(1, 4))
-            finally:
-                await context.close()
-                await browser.close()
+                        # страница могла зависнуть или упасть - пересоздадим ее на следующем товаре
+                        if page:
+                            await asyncio.gather(page.close(), return_exceptions=True)
+                        page = None
+        except Exception:
+            logger.exception("cannot open browser context")
+            # разбираем свою долю очереди, чтобы не блокировать остальные страницы
+            while await queue.get() is not None:
+                pass
 
-        logger.debug("parsing products finished")
-        return result
+    async def _fetch_product_update_via_api(self, product: Product) -> ProductFetchResultSchema | None:
+        api_product = await self._fetch_product_via_api(product.url, product.number, product.sku_id)
+        if not api_product:
+            return None
+        return ProductFetchResultSchema(
+            id=product.id,
+            price=product.last_price,
+            new_price=api_product.price,
+            title=product.title or api_product.title,
+            url=product.url,
+            checked_at=datetime.datetime.now(datetime.UTC),
+        )
+
+    async def _fetch_product_via_api(
+        self, url: str, number: str | None = None, sku_id: str | None = None
+    ) -> ProductMinifiedSchema | None:
+        try:
+            if number is None:
+                number, sku_id = parse_product_url(url)
+            with API_FETCH_SECONDS.time():
+                product = await self.api_fetcher.fetch_product(number, sku_id)
+        except ApiFetchError as exc:
+            SCRAPES.labels(source="api", result="failed").inc()
+            logger.warning("api fetch failed for %s: %s", url, exc)
+            return None
+        SCRAPES.labels(source="api", result="ok").inc()
+        return product
+
+    def _compare_with_api(
+        self, url: str, title: str | None, price: float, api_product: ProductMinifiedSchema | None
+    ) -> None:
+        if api_product is None:
+            logger.warning("shadow compare %s: api returned nothing", url)
+        elif api_product.price != price or (title and api_product.title != title.strip()):
+            logger.warning(
+                "shadow compare %s: page=(%r, %s), api=(%r, %s)",
+                url,
+                title,
+                price,
+                api_product.title,
+                api_product.price,
+            )
 
     def _parse_price_to_float(self, price_text: str) -> float:
         digits = re.findall(r"\d+", price_text)
@@ -1,33 +1,126 @@
+import asyncio
+import itertools
 import json
+import logging
+import time
+from typing import Iterable, Iterator
 
 import aio_pika
 import aio_pika.abc
+import aio_pika.exceptions
 
 from app.config.settings import app_config
 
+logger = logging.getLogger(__name__)
+
+# ошибки, после которых сообщение считается неподтвержденным и отправляется повторно
+RETRY_ERRORS = (aio_pika.exceptions.AMQPError, ConnectionError, asyncio.TimeoutError)
+
 
 class RabbitPublisher:
+    """Публикация сообщений с подтверждениями брокера (publisher confirms).
+
+    Сообщения распределяются по пулу каналов по кругу, на каждом канале публикации идут конвейером,
+    не дожидаясь подтверждения предыдущих. publish_many держит в полете не больше window
+    неподтвержденных сообщений и повторяет те, что не подтверждены из-за обрыва соединения.
+    """
+
     connection: aio_pika.abc.AbstractRobustConnection
-    channel: aio_pika.abc.AbstractChannel
-    exchange: aio_pika.abc.AbstractExchange
+    channels: list[aio_pika.abc.AbstractChannel]
+    _exchanges: Iterator[aio_pika.abc.AbstractExchange]
+
+    def __init__(
+        self,
+        channel_pool_size: int | None = None,
+        window: int | None = None,
+        max_retries: int | None = None,
+    ) -> None:
+        self.channel_pool_size = channel_pool_size or app_config.rabbitmq.publish_channel_pool_size
+        self.window = window or app_config.rabbitmq.publish_window
+        self.max_retries = app_config.rabbitmq.publish_retries if max_retries is None else max_retries
 
     async def start(self):
         self.connection = await aio_pika.connect_robust(app_config.rabbitmq.rabbitmq_uri)
-        self.channel = await self.connection.channel()
-        self.exchange = await self.channel.declare_exchange(
-            app_config.rabbitmq.exchange, type=app_config.rabbitmq.exchange_type, durable=True
-        )
+        self.channels = []
+        exchanges = []
+        for _ in range(self.channel_pool_size):
+            channel = await self.connection.channel(publisher_confirms=True)
+            exchange = await channel.declare_exchange(
+                app_config.rabbitmq.exchange, type=app_config.rabbitmq.exchange_type, durable=True
+            )
+            self.channels.append(channel)
+            exchanges.append(exchange)
+        self._exchanges = itertools.cycle(exchanges)
 
     async def publish(self, product_id: int, url: str):
-        payload = json.dumps({"product_id": product_id, "url": url}).encode()
+        await self._publish({"product_id": product_id, "url": url}, app_config.rabbitmq.routing_key_product_add)
+
+    async def publish_products_check(self, product_ids: Iterable[int]):
+        """Задача на плановую проверку цен пачки товаров."""
+
+        await self._publish({"product_ids": list(product_ids)}, app_config.rabbitmq.routing_key_product_check)
+
+    async def publish_products_checks(self, batches: Iterable[Iterable[int]]) -> int:
+        """Задачи на проверку цен для нескольких пачек товаров одной волной."""
+
+        return await self.publish_many(
+            ({"product_ids": list(product_ids)}, app_config.rabbitmq.routing_key_product_check)
+            for product_ids in batches
+        )
+
+    async def publish_notifications(self, payloads: Iterable[dict]) -> int:
+        """Оповещения пользователей из outbox: {"telegram_id": ..., "products": [...]}."""
+
+        return await self.publish_many((payload, app_config.rabbitmq.routing_key_notification) for payload in payloads)
+
+    async def publish_many(self, messages: Iterable[tuple[dict, str]]) -> int:
+        """Конвейерная публикация пар (data, routing_key), возвращается после подтверждения всех сообщений.
+
+        Если сообщение так и не подтверждено после max_retries повторов, исключение пробрасывается
+        после завершения остальных публикаций.
+        """
 
-        await self.exchange.publish(
-            aio_pika.Message(
-                body=payload, delivery_mode=aio_pika.DeliveryMode.PERSISTENT, content_type="application/json"
-            ),
-            routing_key=app_config.rabbitmq.routing_key_product_add,
+        started_at = time.monotonic()
+        window = asyncio.Semaphore(self.window)
+
+        async def publish_one(data: dict, routing_key: str) -> None:
+            async with window:
+                await self._publish(data, routing_key)
+
+        results = await asyncio.gather(
+            *(publish_one(data, routing_key) for data, routing_key in messages), return_exceptions=True
         )
+        errors = [result for result in results if isinstance(result, BaseException)]
+        published = len(results) - len(errors)
+
+        elapsed = time.monotonic() - started_at
+        rate = published / elapsed if elapsed else 0
+        logger.info("published %s messages in %.2fs (%.0f msg/s), %s failed", published, elapsed, rate, len(errors))
+        if errors:
+            raise errors[0]
+        return published
 
     async def close(self):
-        await self.channel.close()
+        for channel in self.channels:
+            await channel.close()
         await self.connection.close()
+
+    async def _publish(self, data: dict, routing_key: str):
+        payload = json.dumps(data).encode()
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                # с publisher confirms publish ждет подтверждения брокера
+                await next(self._exchanges).publish(
+                    aio_pika.Message(
+                        body=payload, delivery_mode=aio_pika.DeliveryMode.PERSISTENT, content_type="application/json"
+                    ),
+                    routing_key=routing_key,
+                )
+                return
+            except RETRY_ERRORS:
+                if attempt == self.max_retries:
+                    raise
+                logger.warning("message to %s not confirmed, retry %s", routing_key, attempt + 1)
+                # robust-соединение восстанавливается само, даем ему время
+                await asyncio.sleep(min(2**attempt, 10))
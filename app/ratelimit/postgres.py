@@ -0,0 +1,23 @@
+import asyncio
+
+from app.db.client import DBClient
+
+
+class PostgresTokenBucket:
+    """Token bucket, общий для всех процессов, с состоянием в таблице rate_limits.
+
+    Каждый acquire - один атомарный UPSERT: токены пополняются по времени с прошлого запроса и
+    сразу списываются. Если баланс ушел в минус, токен взят в долг и нужно выждать, пока он восстановится,
+    поэтому процессы без дополнительных блокировок выстраиваются в очередь по времени.
+    """
+
+    def __init__(self, key: str, rate: float, capacity: float | None = None) -> None:
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity or rate
+
+    async def acquire(self, tokens: float = 1) -> None:
+        async with DBClient() as db_client:
+            balance = await db_client.take_rate_limit_tokens(self.key, self.rate, self.capacity, tokens)
+        if balance < 0:
+            await asyncio.sleep(-balance / self.rate)
@@ -5,8 +5,6 @@ from typing import TYPE_CHECKING
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
 if TYPE_CHECKING:
-    from app.bot.uzum_bot import UzumBot
-    from app.db.schemas import ProductFetchResultSchema
     from app.services.product import ProductService
 
 logger = logging.getLogger(__name__)
@@ -17,17 +15,30 @@ class ProductScheduler:
 
     scheduler: AsyncIOScheduler
 
-    def __init__(self, bot: "UzumBot", service: "ProductService", run_interval: int) -> None:
+    def __init__(
+        self,
+        service: "ProductService",
+        run_interval: int,
+        cleanup_interval: int = 60,
+        cleanup_batch_size: int = 500,
+        price_history_retention_days: int = 365,
+        price_partitions_ahead: int = 3,
+    ) -> None:
         self.scheduler = AsyncIOScheduler()
         self.service = service
-        self.bot = bot
         self.run_interval = run_interval
+        self.cleanup_interval = cleanup_interval
+        self.cleanup_batch_size = cleanup_batch_size
+        self.price_history_retention_days = price_history_retention_days
+        self.price_partitions_ahead = price_partitions_ahead
         self.add_all_jobs()
 
     def add_all_jobs(self) -> None:
         self.scheduler.add_job(
             self.update_all_products, "interval", minutes=self.run_interval, next_run_time=datetime.datetime.now()
         )
+        self.scheduler.add_job(self.delete_orphan_products, "interval", minutes=self.cleanup_interval)
+        self.scheduler.add_job(self.maintain_price_history, "interval", days=1, next_run_time=datetime.datetime.now())
 
     async def start(self) -> None:
         """Start."""
@@ -40,15 +51,16 @@ class ProductScheduler:
         self.scheduler.shutdown()
 
     async def update_all_products(self) -> None:
-        """Парсинг цены и заголовка товаров."""
+        """Постановка задач на проверку цен в очередь воркеров."""
 
-        updated_products = await self.service.get_updated_products()
-        if not updated_products:
-            return
-        await self.send_notifications(updated_products)
+        await self.service.publish_products_check()
 
-    async def send_notifications(self, updated_products: list["ProductFetchResultSchema"]) -> None:
-        """Отправка оповещений об изменении цен."""
+    async def delete_orphan_products(self) -> None:
+        """Удаление товаров без подписчиков."""
 
-        user_products = await self.service.collect_user_products(updated_products)
-        await self.bot.send_notification_for_updated_products(user_products)
+        await self.service.delete_orphan_products(self.cleanup_batch_size)
+
+    async def maintain_price_history(self) -> None:
+        """Секции истории цен и свертка старой истории."""
+
+        await self.service.maintain_price_history(self.price_history_retention_days, self.price_partitions_ahead)
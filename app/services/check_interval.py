@@ -0,0 +1,39 @@
+import datetime
+import math
+import random
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from app.db.schemas import ProductCheckStatsSchema
+
+
+class CheckIntervalPolicy:
+    """Интервал до следующей проверки товара.
+
+    Чем чаще менялась цена и чем больше подписчиков, тем ближе интервал к минимальному. После ошибок
+    интервал растет экспоненциально. Время сдвигается случайно в пределах jitter, чтобы проверки
+    распределялись равномерно, а не собирались к одному запуску планировщика.
+    """
+
+    def __init__(self, min_interval: int, max_interval: int, jitter: float = 0.2) -> None:
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.jitter = jitter
+
+    def get_interval(self, stats: "ProductCheckStatsSchema", failed: bool = False) -> datetime.timedelta:
+        if failed:
+            failures = stats.check_failures + 1
+            minutes = self.min_interval * 2 ** min(failures - 1, 16)
+        else:
+            activity = stats.price_changes + math.log2(1 + stats.subscribers)
+            minutes = self.max_interval / (1 + activity)
+
+        minutes = min(max(minutes, self.min_interval), self.max_interval)
+        low = max(minutes * (1 - self.jitter), self.min_interval)
+        high = min(minutes * (1 + self.jitter), self.max_interval)
+        return datetime.timedelta(minutes=random.uniform(low, high) if low < high else minutes)
+
+    def get_next_check_at(
+        self, checked_at: datetime.datetime, stats: "ProductCheckStatsSchema", failed: bool = False
+    ) -> datetime.datetime:
+        return checked_at + self.get_interval(stats, failed)
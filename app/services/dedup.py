@@ -0,0 +1,55 @@
+import contextlib
+import datetime
+import logging
+from dataclasses import dataclass
+from typing import AsyncIterator, Iterable
+
+from app.db.client import DBClient
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DedupStats:
+    requested: int = 0
+    duplicates: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.duplicates / self.requested if self.requested else 0
+
+    def __str__(self):
+        return f"requested={self.requested}, duplicates={self.duplicates}, hit_rate={self.hit_rate:.1%}"
+
+
+class ScrapeDeduplicator:
+    """Отсев повторных задач на парсинг одного и того же товара.
+
+    Перед парсингом воркер берет аренду товара в БД (products.scrape_lease_until), поэтому дубликаты
+    от разных воркеров и реплик, пришедшие во время парсинга или в течение lease после него, пропускаются.
+    """
+
+    def __init__(self, lease: int = 300) -> None:
+        self.lease = datetime.timedelta(seconds=lease)
+        self.stats = DedupStats()
+
+    @contextlib.asynccontextmanager
+    async def claim(self, product_ids: Iterable[int]) -> AsyncIterator[list[int]]:
+        """Товары, которые нужно парсить; при ошибке внутри блока аренда снимается."""
+
+        product_ids = list(product_ids)
+        async with DBClient() as db_client:
+            claimed = await db_client.claim_scrape_leases(product_ids, self.lease)
+
+        self.stats.requested += len(product_ids)
+        if duplicates := set(product_ids) - set(claimed):
+            self.stats.duplicates += len(duplicates)
+            logger.info("skip duplicate scrape of product_ids=%s, dedup %s", sorted(duplicates), self.stats)
+
+        try:
+            yield claimed
+        except BaseException:
+            if claimed:
+                async with DBClient() as db_client:
+                    await db_client.release_scrape_leases(claimed)
+            raise
@@ -1,11 +1,14 @@
 import datetime
 import logging
-from collections import defaultdict
 from typing import TYPE_CHECKING, Iterable
 
 from app.db.client import DBClient
+from app.db.schemas import PriceHistoryPageSchema, ProductListItemSchema
+from app.metrics.metrics import CHECK_WAVE_SECONDS, DB_WRITE_SECONDS, DUE_PRODUCTS, PRODUCTS_QUEUED
+from app.services.check_interval import CheckIntervalPolicy
 
 if TYPE_CHECKING:
+    from app.cache.base import CacheBackend
     from app.db.models import Product
     from app.db.schemas import ProductFetchResultSchema
     from app.parser.uzum import UzumParser
@@ -18,18 +21,50 @@ logger = logging.getLogger(__name__)
 class ProductService:
     """Сервисный слой для работы с товарами."""
 
-    def __init__(self, parser: "UzumParser", publisher: "RabbitPublisher", check_interval: int) -> None:
+    def __init__(
+        self,
+        parser: "UzumParser | None",
+        publisher: "RabbitPublisher | None",
+        check_interval: int,
+        check_batch_size: int = 10,
+        check_lease: int = 30,
+        max_products_per_run: int = 1000,
+        max_check_interval: int | None = None,
+        check_jitter: float = 0.2,
+        volatility_window: int = 30,
+        cache: "CacheBackend | None" = None,
+    ) -> None:
         self.parser = parser
         self.publisher = publisher
         self.check_interval = check_interval
+        self.check_batch_size = check_batch_size
+        self.check_lease = check_lease
+        self.max_products_per_run = max_products_per_run
+        self.volatility_window = volatility_window  # дней
+        # списки товаров и история цен; сбрасывается по тегам user:<id> и product:<id>, см. PostgresInvalidationListener
+        self.cache = cache
+        self.interval_policy = CheckIntervalPolicy(check_interval, max_check_interval or check_interval, check_jitter)
 
     async def add_new_product(self, user_id: int, url: str, number: str, sku_id: str | None) -> None:
+        try:
+            await self._add_new_product(user_id, url, number, sku_id)
+        finally:
+            # NOTIFY придет следом, но следующий запрос пользователя может его опередить
+            if self.cache:
+                await self.cache.invalidate(f"user:{user_id}")
+
+    async def _add_new_product(self, user_id: int, url: str, number: str, sku_id: str | None) -> None:
         async with DBClient() as db_client:
             product = await db_client.check_and_get_product(number, sku_id)
 
             if not product:
+                # цену сразу получит воркер добавления, плановая проверка - через интервал
                 product = await db_client.create_and_add_product_to_user(
-                    user_id=user_id, url=url, number=number, sku_id=sku_id
+                    user_id=user_id,
+                    url=url,
+                    number=number,
+                    sku_id=sku_id,
+                    next_check_at=datetime.datetime.now(datetime.UTC) + datetime.timedelta(minutes=self.check_interval),
                 )
                 logger.debug("product_id=%s, url=%s created", product.id, url)
                 # асинхронно добавим цену и название
@@ -41,59 +76,189 @@ class ProductService:
                 await self.publisher.publish(product.id, url)
                 return
 
-    async def get_user_products(self, user_id: int) -> list["Product"]:
+    async def get_user_products(self, user_id: int) -> list[ProductListItemSchema]:
+        key = f"user_products:{user_id}"
+        generation = None
+        if self.cache:
+            if (products := await self.cache.get(key)) is not None:
+                return products
+            # NOTIFY об изменении, закоммиченном во время чтения, может опередить set - тогда set пропускается
+            generation = await self.cache.generation()
+
         async with DBClient() as db_client:
-            return await db_client.get_user_products(user_id)
+            products = [
+                ProductListItemSchema.model_validate(product) for product in await db_client.get_user_products(user_id)
+            ]
+        if self.cache:
+            tags = [f"user:{user_id}", *(f"product:{product.id}" for product in products)]
+            await self.cache.set(key, products, tags, generation)
+        return products
 
     async def delete_user_product(self, user_id: int, product_id: int) -> None:
         async with DBClient() as db_client:
             await db_client.delete_user_product(user_id, product_id)
+        if self.cache:
+            await self.cache.invalidate(f"user:{user_id}")
+
+    async def get_price_history(
+        self,
+        product_id: int,
+        cursor: tuple[datetime.datetime, int] | None = None,
+        older: bool = True,
+        page_size: int = 20,
+        periods: Iterable[int] = (7, 30, 90),
+    ) -> "PriceHistoryPageSchema | None":
+        """Страница истории цен со сводкой за периоды."""
 
-    async def get_product_with_prices(self, product_id: int) -> "Product":
+        periods = tuple(periods)
+        key = (
+            f"price_history:{product_id}:{cursor and (cursor[0].isoformat(), cursor[1])}:{older}:{page_size}:{periods}"
+        )
+        generation = None
+        if self.cache:
+            if (page := await self.cache.get(key)) is not None:
+                return page
+            generation = await self.cache.generation()
+
+        page = await self._get_price_history(product_id, cursor, older, page_size, periods)
+        if self.cache and page:
+            await self.cache.set(key, page, [f"product:{product_id}"], generation)
+        return page
+
+    async def _get_price_history(
+        self,
+        product_id: int,
+        cursor: tuple[datetime.datetime, int] | None,
+        older: bool,
+        page_size: int,
+        periods: Iterable[int],
+    ) -> "PriceHistoryPageSchema | None":
         async with DBClient() as db_client:
-            return await db_client.get_product_with_prices(product_id)
+            product = await db_client.get_product_by_id(product_id)
+            if not product:
+                return None
+            items = await db_client.get_price_history(product_id, page_size + 1, cursor, older)
+            if not items and cursor:
+                # записи за курсором удалены или свернуты между нажатиями - показываем первую страницу
+                cursor, older = None, True
+                items = await db_client.get_price_history(product_id, page_size + 1)
+
+            has_more = len(items) > page_size
+            items = items[:page_size]
+            if not older:
+                items.reverse()
+            # в направлении листания наличие записей видно по лишней строке, в обратном - проверяем запросом
+            has_newer = not older and has_more
+            has_older = older and has_more
+            if items and cursor:
+                if older:
+                    has_newer = await db_client.has_price_history(
+                        product_id, (items[0].created_at, items[0].id), older=False
+                    )
+                else:
+                    has_older = await db_client.has_price_history(
+                        product_id, (items[-1].created_at, items[-1].id), older=True
+                    )
+            stats = await db_client.get_price_stats(product_id, periods)
 
-    async def get_products_to_check(self) -> Iterable["Product"]:
+        return PriceHistoryPageSchema(
+            product_id=product_id,
+            title=product.title,
+            current_price=product.last_price,
+            stats=stats,
+            items=items,
+            has_newer=has_newer,
+            has_older=has_older,
+        )
+
+    async def publish_products_check(self) -> int:
+        """Забрать товары, которые пора проверить, и одной волной поставить задачи на проверку их цен."""
+
+        lease = datetime.timedelta(minutes=self.check_lease)
+        batches = []
+        claimed = 0
+        with CHECK_WAVE_SECONDS.time():
+            while claimed < self.max_products_per_run:
+                limit = min(self.check_batch_size, self.max_products_per_run - claimed)
+                async with DBClient() as db_client:
+                    product_ids = await db_client.claim_products_to_check(limit, lease)
+                if not product_ids:
+                    break
+
+                batches.append(product_ids)
+                claimed += len(product_ids)
+
+            # неопубликованные задачи не теряются: по истечении аренды товары будут забраны снова
+            if batches:
+                await self.publisher.publish_products_checks(batches)
+
+        # остаток, не уместившийся в max_products_per_run
         async with DBClient() as db_client:
-            time_to_check = self._get_time_to_check(self.check_interval)
-            products: Iterable["Product"] = await db_client.get_products_to_check(time_to_check)
-        return products
+            DUE_PRODUCTS.set(await db_client.count_due_products())
+        PRODUCTS_QUEUED.inc(claimed)
+        logger.info("%s products queued for check", claimed)
+        return claimed
+
+    async def delete_orphan_products(self, batch_size: int) -> int:
+        """Удаление товаров, у которых не осталось подписчиков, пачками по batch_size."""
 
-    async def get_updated_products(self) -> list["ProductFetchResultSchema"]:
-        products_to_check = await self.get_products_to_check()
-        if not products_to_check:
+        deleted = 0
+        while True:
+            async with DBClient() as db_client:
+                count = await db_client.delete_orphan_products(batch_size)
+            deleted += count
+            if not count or count < batch_size:
+                break
+
+        logger.info("%s orphan products deleted", deleted)
+        return deleted
+
+    async def maintain_price_history(self, retention_days: int, partitions_ahead: int) -> None:
+        """Создание секций истории цен наперед и свертка по дням истории старше retention_days."""
+
+        async with DBClient() as db_client:
+            await db_client.create_price_partitions(partitions_ahead)
+            if retention_days:
+                before = datetime.datetime.now(datetime.UTC).date() - datetime.timedelta(days=retention_days)
+                await db_client.downsample_price_history(before)
+
+    async def check_products(self, product_ids: Iterable[int]) -> list["ProductFetchResultSchema"]:
+        """Проверка цен товаров воркером.
+
+        Оповещения подписчиков сохраняются в outbox вместе с ценами, в очередь их переносит OutboxRelay.
+        """
+
+        async with DBClient() as db_client:
+            products = await db_client.get_products_by_ids(product_ids)
+        if not products:
             return []
 
-        parsed_products = await self.process_products_check(products_to_check)
+        parsed_products = await self.process_products_check(products)
         return self._filter_updated_products(parsed_products)
 
     async def process_products_check(self, products: Iterable["Product"]) -> list["ProductFetchResultSchema"]:
+        """Парсинг и сохранение результатов проверки и оповещений одной транзакцией."""
+
+        products = list(products)
         result: list["ProductFetchResultSchema"] = await self.parser.fetch_products_updates(products)
+        checked_ids = {product.id for product in result}
+        now = datetime.datetime.now(datetime.UTC)
 
         async with DBClient() as db_client:
-            for parsed_product in result:
-                product_data: dict = {"last_checked_at": parsed_product.checked_at}
-                if parsed_product.new_price != parsed_product.price:
-                    await db_client.add_new_price(parsed_product.id, parsed_product.new_price)
-                    product_data["last_price"] = parsed_product.new_price
-                    product_data["title"] = parsed_product.title
-
-                await db_client.update_product(parsed_product.id, **product_data)
+            stats = await db_client.get_products_check_stats(
+                [product.id for product in products], since=now - datetime.timedelta(days=self.volatility_window)
+            )
+            next_checks = {
+                item.product_id: self.interval_policy.get_next_check_at(
+                    now, item, failed=item.product_id not in checked_ids
+                )
+                for item in stats
+            }
+            with DB_WRITE_SECONDS.labels(operation="save_products_check").time():
+                notifications = await db_client.save_products_check(result, next_checks)
+        logger.info("%s products checked, %s notifications queued", len(result), notifications)
         return result
 
-    async def collect_user_products(
-        self, products: list["ProductFetchResultSchema"]
-    ) -> dict[int, list["ProductFetchResultSchema"]]:
-        products_by_id = {product.id: product for product in products}
-        async with DBClient() as db_client:
-            user_products = await db_client.get_user_products_by_product_ids(products_by_id.keys())
-
-        user_updated_products = defaultdict(list)
-        for telegram_id, product_id in user_products:
-            user_updated_products[telegram_id].append(products_by_id[product_id])
-
-        return user_updated_products
-
     def _filter_updated_products(self, products: list["ProductFetchResultSchema"]) -> list["ProductFetchResultSchema"]:
         return [product for product in products if product.new_price != product.price]
 
@@ -0,0 +1,156 @@
+import asyncio
+import contextlib
+import json
+import signal
+from abc import ABC, abstractmethod
+from logging import getLogger
+
+import aio_pika
+import aio_pika.abc
+import aio_pika.exceptions
+
+from app.config.settings import app_config
+from app.db.client import DBClient, sessionmanager
+from app.db.profiling import create_profiler
+from app.metrics.metrics import FAILURES, MESSAGES_PROCESSED, QUEUE_DEPTH
+from app.metrics.server import MetricsServer
+from app.parser.uzum import UzumParser
+from app.services.dedup import ScrapeDeduplicator
+from app.workers.retry import RetryPolicy
+
+logger = getLogger(__name__)
+
+
+class BaseWorker(ABC):
+    """Базовый consumer очереди RabbitMQ с парсером Узум."""
+
+    queue_name: str
+    routing_key: str
+
+    connection: aio_pika.abc.AbstractRobustConnection | None = None
+    channel: aio_pika.abc.AbstractChannel
+    exchange: aio_pika.abc.AbstractExchange
+    queue: aio_pika.abc.AbstractQueue
+    parser: UzumParser | None = None
+    retry_policy: RetryPolicy
+    metrics_server: MetricsServer | None = None
+
+    def __init__(self, concurrency: int | None = None) -> None:
+        # одновременно обрабатываемые сообщения = prefetch = открытые контексты браузера
+        self.concurrency = max(concurrency or app_config.worker.concurrency, 1)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._tasks: set[asyncio.Task] = set()
+        self._stop_event = asyncio.Event()
+        self.dedup = ScrapeDeduplicator(app_config.worker.dedup_lease)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+
+    async def start(self) -> None:
+        sessionmanager.init(app_config.database_uri, create_profiler(app_config.db))
+        self.connection = await aio_pika.connect_robust(app_config.rabbitmq.rabbitmq_uri)
+        self.channel = await self.connection.channel()
+        await self.channel.set_qos(prefetch_count=self.concurrency)
+        self.exchange = await self.channel.declare_exchange(
+            app_config.rabbitmq.exchange, type=app_config.rabbitmq.exchange_type, durable=True
+        )
+        self.queue = await self.channel.declare_queue(self.queue_name, durable=True)
+        await self.queue.bind(self.exchange, routing_key=self.routing_key)
+        self.retry_policy = RetryPolicy(
+            self.queue_name,
+            self.routing_key,
+            max_retries=app_config.worker.max_retries,
+            base_delay=app_config.worker.retry_base_delay,
+        )
+        await self.retry_policy.declare(self.channel, app_config.rabbitmq.exchange)
+
+        self.parser = UzumParser.from_config(app_config.parser)
+        await self.parser.start()
+
+        if app_config.metrics.enabled:
+            self.metrics_server = MetricsServer(app_config.metrics.host, app_config.metrics.port)
+            self.metrics_server.add_readiness_check("db", self._check_db)
+            self.metrics_server.add_readiness_check("rabbitmq", self._check_rabbitmq)
+            self.metrics_server.add_readiness_check("browser", self._check_browser)
+            await self.metrics_server.start()
+
+    async def run(self) -> None:
+        """Обработка сообщений до сигнала остановки, затем дожидаемся начатых."""
+
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self._stop_event.set)
+
+        consumer_tag = await self.queue.consume(self._on_message)
+        queue_depth_task = asyncio.create_task(self._track_queue_depth())
+        await self._stop_event.wait()
+        queue_depth_task.cancel()
+
+        logger.info("stopping, %s messages in flight", len(self._tasks))
+        await self.queue.cancel(consumer_tag)
+        if self._tasks:
+            await asyncio.wait(self._tasks)
+
+    async def _on_message(self, message: aio_pika.abc.AbstractIncomingMessage) -> None:
+        task = asyncio.create_task(self._process_with_limit(message))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _process_with_limit(self, message: aio_pika.abc.AbstractIncomingMessage) -> None:
+        async with self._semaphore:
+            await self.process_message(message)
+
+    async def process_message(self, message: aio_pika.abc.AbstractIncomingMessage) -> None:
+        try:
+            payload = json.loads(message.body.decode())
+            await self.handle_payload(payload)
+            await message.ack()
+            MESSAGES_PROCESSED.labels(queue=self.queue_name, result="ok").inc()
+        except json.JSONDecodeError as exc:
+            logger.exception("error decoding json: %s", message.body)
+            MESSAGES_PROCESSED.labels(queue=self.queue_name, result="invalid").inc()
+            await self.retry_policy.dead_letter(message, exc)
+        except Exception as exc:
+            logger.exception("error handling message %s", message.body)
+            MESSAGES_PROCESSED.labels(queue=self.queue_name, result="failed").inc()
+            FAILURES.labels(kind=type(exc).__name__).inc()
+            # не возвращаем в начало очереди: сообщение с постоянной ошибкой крутилось бы без паузы
+            try:
+                await self.retry_policy.retry(message, exc)
+            except Exception:
+                logger.exception("error scheduling retry, requeue")
+                await message.nack(requeue=True)
+
+    @abstractmethod
+    async def handle_payload(self, payload: dict) -> None: ...
+
+    async def _track_queue_depth(self, interval: float = 15) -> None:
+        while True:
+            with contextlib.suppress(aio_pika.exceptions.AMQPError, ConnectionError):
+                queue = await self.channel.declare_queue(self.queue_name, passive=True)
+                QUEUE_DEPTH.labels(queue=self.queue_name).set(queue.declaration_result.message_count)
+            await asyncio.sleep(interval)
+
+    async def _check_db(self) -> bool:
+        async with DBClient() as db_client:
+            return await db_client.ping()
+
+    async def _check_rabbitmq(self) -> bool:
+        return bool(self.connection and not self.connection.is_closed)
+
+    async def _check_browser(self) -> bool:
+        return bool(self.parser and self.parser.browser_manager.is_ready())
+
+    async def stop(self) -> None:
+        logger.info("scrape dedup: %s", self.dedup.stats)
+        if self.metrics_server:
+            await self.metrics_server.stop()
+        if self.parser:
+            await self.parser.close()
+        if self.connection:
+            await self.connection.close()
+        await sessionmanager.close()
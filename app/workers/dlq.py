@@ -0,0 +1,84 @@
+"""Просмотр и повторная отправка сообщений из DLQ воркеров.
+
+python -m app.workers.dlq inspect product.add --limit 20
+python -m app.workers.dlq replay product.add
+"""
+
+import argparse
+import asyncio
+from logging import config as logging_config
+from logging import getLogger
+
+import aio_pika
+import aio_pika.abc
+
+from app.config.logging import LOGGING
+from app.config.settings import app_config
+from app.workers.retry import ATTEMPT_HEADER, ERROR_HEADER, ROUTING_KEY_HEADER, dead_letter_queue_name
+
+logging_config.dictConfig(LOGGING)
+logger = getLogger(__name__)
+
+
+async def inspect_dlq(channel: aio_pika.abc.AbstractChannel, queue_name: str, limit: int) -> None:
+    queue = await channel.declare_queue(dead_letter_queue_name(queue_name), durable=True, passive=True)
+    messages = []
+    try:
+        while len(messages) < limit and (message := await queue.get(fail=False)):
+            messages.append(message)
+            headers = message.headers or {}
+            logger.info(
+                "attempts=%s error=%s body=%s",
+                headers.get(ATTEMPT_HEADER),
+                headers.get(ERROR_HEADER),
+                message.body.decode(errors="replace"),
+            )
+    finally:
+        # только просмотр: возвращаем все сообщения в очередь
+        for message in messages:
+            await message.nack(requeue=True)
+    logger.info("%s messages shown, %s in %s", len(messages), queue.declaration_result.message_count, queue.name)
+
+
+async def replay_dlq(channel: aio_pika.abc.AbstractChannel, queue_name: str, limit: int) -> None:
+    queue = await channel.declare_queue(dead_letter_queue_name(queue_name), durable=True, passive=True)
+    exchange = await channel.get_exchange(app_config.rabbitmq.exchange)
+    replayed = 0
+    while replayed < limit and (message := await queue.get(fail=False)):
+        headers = dict(message.headers or {})
+        routing_key = headers.pop(ROUTING_KEY_HEADER, queue_name)
+        # счетчик попыток сбрасывается, сообщение снова проходит все повторы
+        headers.pop(ATTEMPT_HEADER, None)
+        headers.pop(ERROR_HEADER, None)
+        await exchange.publish(
+            aio_pika.Message(
+                body=message.body,
+                content_type=message.content_type,
+                delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+                headers=headers,
+            ),
+            routing_key=routing_key,
+        )
+        await message.ack()
+        replayed += 1
+    logger.info("%s messages replayed from %s", replayed, queue.name)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="DLQ воркеров")
+    parser.add_argument("command", choices=["inspect", "replay"])
+    parser.add_argument("queue", help="основная очередь воркера, например product.add")
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+
+    connection = await aio_pika.connect_robust(app_config.rabbitmq.rabbitmq_uri)
+    async with connection:
+        channel = await connection.channel()
+        if args.command == "inspect":
+            await inspect_dlq(channel, args.queue, args.limit)
+        else:
+            await replay_dlq(channel, args.queue, args.limit)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+import asyncio
+import contextlib
+import signal
+from logging import config as logging_config
+from logging import getLogger
+
+from app.config.logging import LOGGING
+from app.config.settings import app_config
+from app.db.client import DBClient, sessionmanager
+from app.db.profiling import create_profiler
+from app.publisher.publisher import RabbitPublisher
+
+logging_config.dictConfig(LOGGING)
+logger = getLogger(__name__)
+
+
+class OutboxRelay:
+    """Перенос оповещений из notification_outbox в очередь notification.
+
+    Пачка строк блокируется FOR UPDATE SKIP LOCKED, публикуется конвейером с подтверждением брокера и удаляется
+    в той же транзакции, поэтому реле можно запускать в нескольких экземплярах. При сбое между публикацией
+    и удалением оповещение уйдет повторно (at-least-once).
+    """
+
+    publisher: RabbitPublisher | None = None
+
+    def __init__(self, batch_size: int = 100, poll_interval: float = 1) -> None:
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._stop_event = asyncio.Event()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+
+    async def start(self) -> None:
+        sessionmanager.init(app_config.database_uri, create_profiler(app_config.db))
+        self.publisher = RabbitPublisher()
+        await self.publisher.start()
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self._stop_event.set)
+
+        while not self._stop_event.is_set():
+            try:
+                relayed = await self.relay_batch()
+            except Exception:
+                logger.exception("error relaying notifications")
+                relayed = 0
+
+            # полная пачка - в outbox, скорее всего, есть еще, забираем сразу
+            if relayed < self.batch_size:
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._stop_event.wait(), self.poll_interval)
+
+    async def relay_batch(self) -> int:
+        async with DBClient() as db_client:
+            notifications = await db_client.lock_outbox_notifications(self.batch_size)
+            if not notifications:
+                return 0
+
+            await self.publisher.publish_notifications(payload for _, payload in notifications)
+            await db_client.delete_outbox_notifications(outbox_id for outbox_id, _ in notifications)
+
+        logger.info("%s notifications relayed", len(notifications))
+        return len(notifications)
+
+    async def stop(self) -> None:
+        if self.publisher:
+            await self.publisher.close()
+        await sessionmanager.close()
+
+
+async def main() -> None:
+    async with OutboxRelay(app_config.outbox.batch_size, app_config.outbox.poll_interval) as relay:
+        await relay.run()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,54 @@
+import asyncio
+from logging import config as logging_config
+from logging import getLogger
+
+from app.config.logging import LOGGING
+from app.config.settings import app_config
+from app.services.product import ProductService
+from app.workers.base import BaseWorker
+
+logging_config.dictConfig(LOGGING)
+logger = getLogger(__name__)
+
+
+class ProductCheckWorker(BaseWorker):
+    """Плановая проверка цен пачки товаров, поставленной планировщиком."""
+
+    queue_name = app_config.rabbitmq.queue_product_check
+    routing_key = app_config.rabbitmq.routing_key_product_check
+
+    service: ProductService
+
+    async def start(self) -> None:
+        await super().start()
+        # оповещения пишутся в outbox, публикует их OutboxRelay
+        self.service = ProductService(
+            self.parser,
+            None,
+            app_config.min_check_interval,
+            max_check_interval=app_config.max_check_interval,
+            check_jitter=app_config.check_jitter,
+            volatility_window=app_config.volatility_window,
+        )
+
+    async def handle_payload(self, payload: dict) -> None:
+        product_ids = payload.get("product_ids")
+        if not product_ids:
+            logger.error("invalid payload: %s", payload)
+            return
+
+        async with self.dedup.claim(product_ids) as claimed:
+            if not claimed:
+                return
+
+            logger.info("checking product_ids=%s", claimed)
+            await self.service.check_products(claimed)
+
+
+async def main() -> None:
+    async with ProductCheckWorker() as worker:
+        await worker.run()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
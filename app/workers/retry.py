@@ -0,0 +1,99 @@
+import logging
+
+import aio_pika
+import aio_pika.abc
+
+logger = logging.getLogger(__name__)
+
+ATTEMPT_HEADER = "x-attempt"
+ERROR_HEADER = "x-last-error"
+ROUTING_KEY_HEADER = "x-original-routing-key"
+
+
+def get_attempt(message: aio_pika.abc.AbstractIncomingMessage) -> int:
+    """Сколько раз сообщение уже обрабатывалось с ошибкой."""
+
+    return int((message.headers or {}).get(ATTEMPT_HEADER) or 0)
+
+
+def retry_queue_name(queue_name: str, delay: int) -> str:
+    return f"{queue_name}.retry.{delay}s"
+
+
+def dead_letter_queue_name(queue_name: str) -> str:
+    return f"{queue_name}.dlq"
+
+
+class RetryPolicy:
+    """Отложенные повторы с экспоненциальной задержкой и очередь недоставленных (DLQ).
+
+    Для каждой задержки объявляется очередь {queue}.retry.{delay}s без consumer'ов: сообщение лежит в ней
+    x-message-ttl и через dead-letter exchange возвращается в основной exchange с исходным routing key.
+    Номер попытки хранится в заголовке x-attempt; после max_retries неудачных повторов сообщение
+    уходит в {queue}.dlq, откуда его можно посмотреть и вернуть командой app.workers.dlq.
+    """
+
+    def __init__(self, queue_name: str, routing_key: str, max_retries: int = 4, base_delay: int = 30) -> None:
+        self.queue_name = queue_name
+        self.routing_key = routing_key
+        self.delays = [base_delay * 2**attempt for attempt in range(max_retries)]  # секунд
+        self.dlq_name = dead_letter_queue_name(queue_name)
+        self.exchange: aio_pika.abc.AbstractExchange | None = None
+
+    async def declare(self, channel: aio_pika.abc.AbstractChannel, exchange_name: str) -> None:
+        for delay in self.delays:
+            await channel.declare_queue(
+                retry_queue_name(self.queue_name, delay),
+                durable=True,
+                arguments={
+                    "x-message-ttl": delay * 1000,
+                    "x-dead-letter-exchange": exchange_name,
+                    "x-dead-letter-routing-key": self.routing_key,
+                },
+            )
+        await channel.declare_queue(self.dlq_name, durable=True)
+        # в очереди повторов и DLQ публикуем напрямую, через exchange по умолчанию
+        self.exchange = channel.default_exchange
+
+    async def retry(self, message: aio_pika.abc.AbstractIncomingMessage, error: BaseException | str) -> None:
+        """Отправить сообщение на повтор с задержкой или в DLQ и подтвердить исходное."""
+
+        attempt = get_attempt(message) + 1
+        if attempt <= len(self.delays):
+            delay = self.delays[attempt - 1]
+            target = retry_queue_name(self.queue_name, delay)
+            logger.warning("attempt %s failed, retry in %ss: %s", attempt, delay, error)
+        else:
+            target = self.dlq_name
+            logger.error("attempt %s failed, moved to %s: %s", attempt, self.dlq_name, error)
+
+        await self._republish(message, target, attempt, error)
+
+    async def dead_letter(self, message: aio_pika.abc.AbstractIncomingMessage, error: BaseException | str) -> None:
+        """Сразу в DLQ, без повторов: например, сообщение не разбирается."""
+
+        await self._republish(message, self.dlq_name, get_attempt(message) + 1, error)
+
+    async def _republish(
+        self,
+        message: aio_pika.abc.AbstractIncomingMessage,
+        target: str,
+        attempt: int,
+        error: BaseException | str,
+    ) -> None:
+        await self.exchange.publish(
+            aio_pika.Message(
+                body=message.body,
+                content_type=message.content_type,
+                delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+                headers={
+                    **(message.headers or {}),
+                    ATTEMPT_HEADER: attempt,
+                    ERROR_HEADER: str(error)[:500],
+                    ROUTING_KEY_HEADER: self.routing_key,
+                },
+            ),
+            routing_key=target,
+        )
+        # исходное подтверждаем только после того, как копия принята брокером
+        await message.ack()
@@ -0,0 +1,81 @@
+"""Чтение через кэш не сохраняет значение, устаревшее из-за инвалидации во время запроса к БД."""
+
+import datetime
+
+import pytest
+
+from app.cache.memory import MemoryCacheBackend
+from app.db.client import DBClient
+from app.db.profiling import QueryProfiler
+from app.services.product import ProductService
+
+
+async def test_set_skipped_after_invalidation():
+    cache = MemoryCacheBackend()
+    generation = await cache.generation()
+    # чтение из БД идет, в это время приходит NOTIFY
+    await cache.invalidate("product:1")
+    await cache.set("user_products:1", ["stale"], ["user:1", "product:1"], generation)
+
+    assert await cache.get("user_products:1") is None
+
+
+async def test_set_kept_when_other_tags_invalidated():
+    cache = MemoryCacheBackend()
+    generation = await cache.generation()
+    await cache.invalidate("product:2")
+    await cache.set("user_products:1", ["fresh"], ["user:1", "product:1"], generation)
+
+    assert await cache.get("user_products:1") == ["fresh"]
+
+
+async def test_set_skipped_after_clear():
+    cache = MemoryCacheBackend()
+    generation = await cache.generation()
+    # переподключение слушателя: уведомления могли потеряться
+    await cache.clear()
+    await cache.set("user_products:1", ["stale"], ["user:1"], generation)
+
+    assert await cache.get("user_products:1") is None
+
+
+async def test_set_skipped_after_forgotten_generations():
+    cache = MemoryCacheBackend(maxsize=2)
+    generation = await cache.generation()
+    for product_id in range(3):
+        await cache.invalidate(f"product:{product_id}")
+    await cache.set("user_products:1", ["stale"], ["product:0"], generation)
+
+    assert await cache.get("user_products:1") is None
+
+
+@pytest.fixture
+async def user_id(profiler: QueryProfiler) -> int:
+    async with DBClient() as db_client:
+        user_id = await db_client.upsert_user(1001, "test")
+        await db_client.create_and_add_product_to_user(
+            user_id, "https://uzum.uz/product/1", "1", None, datetime.datetime.now(datetime.UTC)
+        )
+    return user_id
+
+
+async def test_get_user_products_not_cached_when_invalidated_during_read(
+    user_id: int, monkeypatch: pytest.MonkeyPatch
+):
+    cache = MemoryCacheBackend()
+    service = ProductService(None, None, 60, cache=cache)
+    get_user_products = DBClient.get_user_products
+
+    async def read_then_notify(self, user_id: int):
+        products = await get_user_products(self, user_id)
+        # воркер закоммитил новую цену, NOTIFY пришел до сохранения результата в кэш
+        await cache.invalidate(*(f"product:{product.id}" for product in products))
+        return products
+
+    monkeypatch.setattr(DBClient, "get_user_products", read_then_notify)
+    await service.get_user_products(user_id)
+    assert await cache.get(f"user_products:{user_id}") is None
+
+    monkeypatch.setattr(DBClient, "get_user_products", get_user_products)
+    products = await service.get_user_products(user_id)
+    assert await cache.get(f"user_products:{user_id}") == products
@@ -0,0 +1,46 @@
+"""Статистика кэшей публикуется на /metrics."""
+
+import pytest
+
+from app.cache.memory import MemoryCacheBackend
+from app.metrics.metrics import register_cache_stats, unregister_cache_stats
+from app.metrics.registry import REGISTRY
+
+
+@pytest.fixture
+def cache():
+    cache = MemoryCacheBackend(10, 60)
+    register_cache_stats("test", cache.stats)
+    yield cache
+    unregister_cache_stats("test")
+
+
+def cache_lines() -> list[str]:
+    return [line for line in REGISTRY.render().splitlines() if 'cache="test"' in line]
+
+
+async def test_cache_stats_rendered(cache: MemoryCacheBackend):
+    await cache.set("product:1", 1, tags=["product:1"])
+    await cache.get("product:1")
+    await cache.get("product:1")
+    await cache.get("product:2")
+    await cache.invalidate("product:1")
+
+    assert cache_lines() == [
+        'uzum_cache_requests_total{cache="test",result="hit"} 2.0',
+        'uzum_cache_requests_total{cache="test",result="miss"} 1.0',
+        'uzum_cache_invalidations_total{cache="test"} 1.0',
+    ]
+
+
+def test_cache_stats_registered_once(cache: MemoryCacheBackend):
+    register_cache_stats("test", cache.stats)
+
+    assert len(cache_lines()) == 3
+
+
+def test_cache_stats_unregistered():
+    register_cache_stats("test", MemoryCacheBackend().stats)
+    unregister_cache_stats("test")
+
+    assert cache_lines() == []
@@ -0,0 +1,75 @@
+"""Частые запросы не подтягивают историю цен: число запросов и строк не зависит от ее размера."""
+
+import datetime
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.exc import InvalidRequestError
+
+from app.db.client import DBClient
+from app.db.models import ProductPrice
+from app.db.profiling import QueryProfiler, StatementStats
+
+PRODUCTS = 3
+PRICES_PER_PRODUCT = 50
+
+
+def statements(profiler: QueryProfiler, caller: str) -> list[tuple[str, StatementStats]]:
+    return [(statement, stats) for (statement, method), stats in profiler.stats.items() if method == caller]
+
+
+@pytest.fixture
+async def user(profiler: QueryProfiler) -> tuple[int, int]:
+    """Пользователь с несколькими товарами, у каждого длинная история цен; (telegram_id, user_id)."""
+
+    telegram_id = 1001
+    async with DBClient() as db_client:
+        await db_client.create_price_partitions(1)
+        user_id = await db_client.upsert_user(telegram_id, "test")
+        for number in range(PRODUCTS):
+            product = await db_client.create_and_add_product_to_user(
+                user_id, f"https://uzum.uz/product/{number}", str(number), None, datetime.datetime.now(datetime.UTC)
+            )
+            await db_client.db_session.execute(
+                insert(ProductPrice), [{"product_id": product.id, "price": price} for price in range(PRICES_PER_PRODUCT)]
+            )
+        await db_client.db_session.commit()
+    profiler.reset()
+    return telegram_id, user_id
+
+
+async def test_get_user_products(profiler: QueryProfiler, user: tuple[int, int]):
+    async with DBClient() as db_client:
+        products = await db_client.get_user_products(user[1])
+
+    [(statement, stats)] = statements(profiler, "DBClient.get_user_products")
+    assert stats.count == 1
+    assert stats.rows == PRODUCTS
+    assert "productprices" not in statement
+    assert len(products) == PRODUCTS
+    with pytest.raises(InvalidRequestError):
+        products[0].prices  # noqa: B018
+
+
+async def test_claim_products_to_check(profiler: QueryProfiler, user: tuple[int, int]):
+    async with DBClient() as db_client:
+        product_ids = await db_client.claim_products_to_check(10, datetime.timedelta(minutes=30))
+
+    [(statement, stats)] = statements(profiler, "DBClient.claim_products_to_check")
+    assert stats.count == 1
+    assert stats.rows == PRODUCTS
+    assert "productprices" not in statement
+    assert len(product_ids) == PRODUCTS
+
+
+async def test_get_user_by_telegram_id(profiler: QueryProfiler, user: tuple[int, int]):
+    async with DBClient() as db_client:
+        db_user = await db_client.get_user_by_telegram_id(user[0])
+
+    [(statement, stats)] = statements(profiler, "DBClient.get_user_by_telegram_id")
+    assert stats.count == 1
+    assert stats.rows == 1
+    assert "products" not in statement
+    assert db_user.id == user[1]
+    with pytest.raises(InvalidRequestError):
+        db_user.products  # noqa: B018
@@ -0,0 +1,81 @@
+"""Кэш состояний диалога: свои записи читаются из кэша, записи другой реплики сбрасывают его по NOTIFY."""
+
+import asyncio
+
+import pytest
+from aiogram.fsm.storage.base import StorageKey
+
+from app.bot.storage import PostgresStorage
+from app.cache.invalidation import PostgresInvalidationListener
+from app.db.client import DBClient
+from app.db.profiling import QueryProfiler
+
+KEY = StorageKey(bot_id=1, chat_id=1001, user_id=1001)
+
+
+async def wait_for(condition, timeout: float = 2) -> None:
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+async def replicas(profiler: QueryProfiler, database_uri: str):
+    """Две реплики бота со своими кэшами и слушателями NOTIFY."""
+
+    storages = [PostgresStorage(origin="replica-a"), PostgresStorage(origin="replica-b")]
+    listeners = [
+        PostgresInvalidationListener([storage.cache], database_uri.replace("+asyncpg", ""), origin=storage.origin)
+        for storage in storages
+    ]
+    for listener in listeners:
+        await listener.start()
+    # слушатель очищает кэш после подключения
+    await asyncio.sleep(0.3)
+    yield storages
+    for listener in listeners:
+        await listener.stop()
+
+
+def fsm_reads(profiler: QueryProfiler) -> int:
+    return sum(stats.count for (_, caller), stats in profiler.stats.items() if caller == "DBClient.get_fsm_record")
+
+
+async def test_own_write_served_from_cache(profiler: QueryProfiler, replicas: list[PostgresStorage]):
+    storage = replicas[0]
+    await storage.set_state(KEY, "Form:url")
+    # свой NOTIFY пропускается слушателем и не сбрасывает только что записанное значение
+    await asyncio.sleep(0.2)
+
+    assert await storage.get_state(KEY) == "Form:url"
+    assert fsm_reads(profiler) == 0
+    assert storage.cache.stats.hits == 1
+
+
+async def test_other_replica_write_invalidates(profiler: QueryProfiler, replicas: list[PostgresStorage]):
+    storage, other = replicas
+    await storage.set_state(KEY, "Form:url")
+    await other.set_state(KEY, "Form:confirm")
+    await wait_for(lambda: storage.cache.stats.invalidations > 1)
+
+    assert await storage.get_state(KEY) == "Form:confirm"
+    assert fsm_reads(profiler) == 1
+
+
+async def test_read_not_cached_when_other_replica_writes_during_it(
+    profiler: QueryProfiler, replicas: list[PostgresStorage], monkeypatch: pytest.MonkeyPatch
+):
+    storage, other = replicas
+    get_fsm_record = DBClient.get_fsm_record
+
+    async def read_then_write(self, key: str):
+        record = await get_fsm_record(self, key)
+        await other.set_state(KEY, "Form:confirm")
+        await wait_for(lambda: storage.cache.stats.invalidations > 0)
+        return record
+
+    monkeypatch.setattr(DBClient, "get_fsm_record", read_then_write)
+    assert await storage.get_state(KEY) is None
+    monkeypatch.setattr(DBClient, "get_fsm_record", get_fsm_record)
+
+    assert await storage.get_state(KEY) == "Form:confirm"
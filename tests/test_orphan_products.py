@@ -0,0 +1,48 @@
+"""Удаление товаров без подписчиков не мешает добавлению существующего товара."""
+
+import datetime
+
+import pytest
+from pydantic import ValidationError
+
+from app.config.settings import SchedulerConfig
+from app.db.client import DBClient
+from app.db.profiling import QueryProfiler
+from app.services.product import ProductService
+
+
+@pytest.fixture
+async def orphan(profiler: QueryProfiler) -> tuple[int, int]:
+    """Товар, от которого отписался последний подписчик; (user_id, product_id)."""
+
+    async with DBClient() as db_client:
+        user_id = await db_client.upsert_user(1001, "test")
+        product = await db_client.create_and_add_product_to_user(
+            user_id, "https://uzum.uz/product/1", "1", None, datetime.datetime.now(datetime.UTC)
+        )
+        await db_client.delete_user_product(user_id, product.id)
+    return user_id, product.id
+
+
+async def test_orphan_kept_while_being_added(orphan: tuple[int, int]):
+    user_id, product_id = orphan
+    async with DBClient() as adding, DBClient() as cleanup:
+        product = await adding.check_and_get_product("1", None)
+        assert await cleanup.delete_orphan_products(10) == 0
+        await adding.add_user_product(user_id, product.id)
+
+    async with DBClient() as cleanup:
+        assert await cleanup.delete_orphan_products(10) == 0
+        assert await cleanup.get_product_by_id(product_id) is not None
+
+
+async def test_orphan_deleted(orphan: tuple[int, int]):
+    service = ProductService(None, None, 60)
+
+    assert await service.delete_orphan_products(10) == 1
+    assert await service.delete_orphan_products(10) == 0
+
+
+def test_cleanup_batch_size_positive():
+    with pytest.raises(ValidationError):
+        SchedulerConfig(cleanup_batch_size=0)
@@ -0,0 +1,220 @@
+"""Быстрый путь через API Узум на заглушке HTTP-сервера с записанными ответами из tests/fixtures/uzum_api."""
+
+import contextlib
+import logging
+from pathlib import Path
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from app.db.models import Product
+from app.db.schemas import ProductFetchResultSchema, ProductMinifiedSchema
+from app.parser.api import ApiFetchError, UzumApiFetcher, parse_product_url
+from app.parser.uzum import FETCH_MODE_API, FETCH_MODE_SHADOW, UzumParser
+
+FIXTURES = Path(__file__).parent / "fixtures" / "uzum_api"
+
+
+def stub_api() -> web.Application:
+    """Отдает записанный ответ по номеру товара; 500 и битый JSON - для проверки ошибок."""
+
+    async def product(request: web.Request) -> web.Response:
+        number = request.match_info["number"]
+        if number == "500":
+            return web.Response(status=500)
+        if number == "999":
+            return web.Response(text="<html>captcha</html>", content_type="text/html")
+        path = FIXTURES / f"{number}.json"
+        if not path.exists():
+            return web.Response(status=404)
+        return web.Response(text=path.read_text(encoding="utf-8"), content_type="application/json")
+
+    app = web.Application()
+    app.router.add_get("/api/v2/product/{number}", product)
+    return app
+
+
+@pytest.fixture
+async def fetcher():
+    server = TestServer(stub_api())
+    await server.start_server()
+    api_fetcher = UzumApiFetcher(f"http://{server.host}:{server.port}/api/v2/product/{{number}}", {})
+    await api_fetcher.start()
+    yield api_fetcher
+    await api_fetcher.close()
+    await server.close()
+
+
+class FakeBrowserManager:
+    """Вместо Chromium: страницу разбирает BrowserParser.fetch_product_with_page."""
+
+    @contextlib.asynccontextmanager
+    async def new_context(self):
+        yield self
+
+    async def new_page(self):
+        return None
+
+
+class BrowserParser(UzumParser):
+    """UzumParser, у которого страница "отдает" заранее заданные товары."""
+
+    def __init__(self, pages: dict[str, ProductMinifiedSchema], **kwargs) -> None:
+        super().__init__(browser_manager=FakeBrowserManager(), **kwargs)
+        self.pages = pages
+        self.loaded: list[str] = []
+
+    async def fetch_product_with_page(self, page, url: str) -> ProductMinifiedSchema:
+        self.loaded.append(url)
+        return self.pages[url]
+
+    async def _fetch_products_with_browser(self, products) -> list[ProductFetchResultSchema]:
+        result = []
+        for product in products:
+            page_product = await self.fetch_product_with_page(None, product.url)
+            result.append(
+                ProductFetchResultSchema(
+                    id=product.id,
+                    price=product.last_price,
+                    new_price=page_product.price,
+                    title=page_product.title,
+                    url=product.url,
+                    checked_at=None,
+                )
+            )
+        return result
+
+
+def product_url(number: str, sku_id: str | None = None) -> str:
+    url = f"https://uzum.uz/ru/product/tovar-{number}"
+    return f"{url}?skuId={sku_id}" if sku_id else url
+
+
+@pytest.mark.parametrize(
+    ("url", "expected"),
+    [
+        ("https://uzum.uz/ru/product/naushniki-tws-1148286", ("1148286", None)),
+        ("https://uzum.uz/ru/product/futbolka-502933?skuId=2107312", ("502933", "2107312")),
+    ],
+)
+def test_parse_product_url(url: str, expected: tuple[str, str | None]):
+    assert parse_product_url(url) == expected
+
+
+def test_parse_product_url_without_number():
+    with pytest.raises(ApiFetchError):
+        parse_product_url("https://uzum.uz/ru/category/naushniki")
+
+
+async def test_fetch_single_sku(fetcher: UzumApiFetcher):
+    product = await fetcher.fetch_product("1148286", None)
+
+    assert product == ProductMinifiedSchema(title="Наушники беспроводные TWS Pro 2", price=249000)
+
+
+async def test_fetch_selects_requested_sku(fetcher: UzumApiFetcher):
+    product = await fetcher.fetch_product("502933", "2107312")
+
+    assert product == ProductMinifiedSchema(title="Футболка хлопковая оверсайз", price=94000)
+
+
+@pytest.mark.parametrize(
+    ("number", "sku_id"),
+    [
+        ("502933", None),  # несколько вариантов, вариант по умолчанию по API не определить
+        ("502933", "1"),  # варианта из ссылки нет в ответе
+        ("780014", None),  # нет в наличии, цены нет
+        ("404404", None),  # payload = null
+        ("500", None),
+        ("999", None),  # вместо JSON страница
+        ("123", None),  # 404
+    ],
+)
+async def test_fetch_rejects_ambiguous_or_inconsistent_data(fetcher: UzumApiFetcher, number: str, sku_id: str | None):
+    with pytest.raises(ApiFetchError):
+        await fetcher.fetch_product(number, sku_id)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        {"title": "", "skuList": [{"id": 1, "purchasePrice": 1000}]},
+        {"title": "Товар", "skuList": [{"id": 1, "purchasePrice": 0}]},
+        {"title": "Товар", "skuList": [{"id": 1, "purchasePrice": "1000"}]},
+        {"title": "Товар", "skuList": []},
+        {"title": "Товар"},
+    ],
+)
+def test_parse_payload_inconsistent(data: dict):
+    with pytest.raises(ApiFetchError):
+        UzumApiFetcher("", {})._parse_payload({"payload": {"data": data}}, "1", None)
+
+
+async def test_api_mode_skips_browser(fetcher: UzumApiFetcher):
+    parser = BrowserParser({}, fetch_mode=FETCH_MODE_API, api_fetcher=fetcher)
+
+    product = await parser.fetch_product(product_url("1148286"))
+
+    assert product.price == 249000
+    assert parser.loaded == []
+
+
+async def test_api_mode_falls_back_to_browser(fetcher: UzumApiFetcher):
+    url = product_url("502933")
+    parser = BrowserParser(
+        {url: ProductMinifiedSchema(title="Футболка", price=89000)}, fetch_mode=FETCH_MODE_API, api_fetcher=fetcher
+    )
+
+    product = await parser.fetch_product(url)
+
+    assert product.price == 89000
+    assert parser.loaded == [url]
+
+
+async def test_api_mode_falls_back_to_browser_for_failed_products(fetcher: UzumApiFetcher):
+    products = [
+        Product(id=1, url=product_url("1148286"), number="1148286", sku_id=None, last_price=259000),
+        Product(id=2, url=product_url("780014"), number="780014", sku_id=None, last_price=199000),
+    ]
+    parser = BrowserParser(
+        {products[1].url: ProductMinifiedSchema(title="Чайник", price=205000)},
+        fetch_mode=FETCH_MODE_API,
+        api_fetcher=fetcher,
+    )
+
+    result = await parser.fetch_products_updates(products)
+
+    assert {item.id: item.new_price for item in result} == {1: 249000, 2: 205000}
+    assert parser.loaded == [products[1].url]
+
+
+async def test_shadow_mode_logs_disagreement(fetcher: UzumApiFetcher, caplog: pytest.LogCaptureFixture):
+    url = product_url("1148286")
+    parser = BrowserParser(
+        {url: ProductMinifiedSchema(title="Наушники беспроводные TWS Pro 2", price=239000)},
+        fetch_mode=FETCH_MODE_SHADOW,
+        api_fetcher=fetcher,
+    )
+
+    with caplog.at_level(logging.WARNING, logger="app.parser.uzum"):
+        product = await parser.fetch_product(url)
+
+    # в shadow-режиме результат всегда со страницы
+    assert product.price == 239000
+    assert "shadow compare" in caplog.text
+    assert "249000" in caplog.text
+
+
+async def test_shadow_mode_silent_when_backends_agree(fetcher: UzumApiFetcher, caplog: pytest.LogCaptureFixture):
+    url = product_url("502933", "2107311")
+    parser = BrowserParser(
+        {url: ProductMinifiedSchema(title="Футболка хлопковая оверсайз", price=89000)},
+        fetch_mode=FETCH_MODE_SHADOW,
+        api_fetcher=fetcher,
+    )
+
+    with caplog.at_level(logging.WARNING, logger="app.parser.uzum"):
+        await parser.fetch_product(url)
+
+    assert "shadow compare" not in caplog.text
@@ -0,0 +1,75 @@
+"""Секции истории цен: строки из productprices_default переносятся в созданную позже секцию и сворачиваются."""
+
+import datetime
+
+import pytest
+from sqlalchemy import func, insert, select, text
+
+from app.db.client import DBClient
+from app.db.models import ProductPrice, product_price_daily
+from app.db.profiling import QueryProfiler
+
+
+def month_start(months: int) -> datetime.datetime:
+    today = datetime.datetime.now(datetime.UTC)
+    month = today.year * 12 + today.month - 1 + months
+    return datetime.datetime(month // 12, month % 12 + 1, 1, 12, tzinfo=datetime.UTC)
+
+
+async def count(db_client: DBClient, table: str) -> int:
+    return (await db_client.db_session.execute(text(f"SELECT count(*) FROM {table}"))).scalar_one()
+
+
+@pytest.fixture
+async def product_id(profiler: QueryProfiler) -> int:
+    async with DBClient() as db_client:
+        user_id = await db_client.upsert_user(1001, "test")
+        product = await db_client.create_and_add_product_to_user(
+            user_id, "https://uzum.uz/product/1", "1", None, datetime.datetime.now(datetime.UTC)
+        )
+    return product.id
+
+
+async def test_partition_created_over_default_rows(product_id: int):
+    # секции созданы миграцией на 3 месяца вперед, дальше строки попадают в секцию по умолчанию
+    created_at = month_start(12)
+    async with DBClient() as db_client:
+        await db_client.db_session.execute(
+            insert(ProductPrice), [{"product_id": product_id, "price": 1000, "created_at": created_at}]
+        )
+        await db_client.db_session.commit()
+        assert await count(db_client, "productprices_default") == 1
+
+        await db_client.create_price_partitions(12)
+
+        assert await count(db_client, "productprices_default") == 0
+        assert await count(db_client, f"productprices_{created_at:%Y_%m}") == 1
+        assert await db_client.db_session.scalar(select(func.count()).select_from(ProductPrice)) == 1
+
+
+async def test_downsample_default_rows(product_id: int):
+    created_at = datetime.datetime(2001, 1, 15, 12, tzinfo=datetime.UTC)
+    async with DBClient() as db_client:
+        await db_client.db_session.execute(
+            insert(ProductPrice),
+            [
+                {"product_id": product_id, "price": price, "created_at": created_at + datetime.timedelta(hours=hour)}
+                for hour, price in enumerate((1000, 900, 950))
+            ],
+        )
+        await db_client.db_session.commit()
+
+        downsampled = await db_client.downsample_price_history(datetime.date(2001, 2, 1))
+
+        assert "productprices_default" in downsampled
+        assert await count(db_client, "productprices_default") == 0
+        row = (await db_client.db_session.execute(select(product_price_daily))).one()
+        assert (row.day, row.min_price, row.max_price, row.last_price) == (created_at.date(), 900, 1000, 950)
+
+
+async def test_price_id_sequence_is_bigint(profiler: QueryProfiler):
+    async with DBClient() as db_client:
+        data_type = await db_client.db_session.scalar(
+            text("SELECT data_type FROM pg_sequences WHERE sequencename = 'productprices_id_seq'")
+        )
+    assert data_type == "bigint"
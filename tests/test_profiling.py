@@ -0,0 +1,74 @@
+"""Нормализация SQL и имя метода DBClient в профилировщике запросов."""
+
+import pytest
+
+from app.db.profiling import current_caller, normalize_sql, track_caller
+
+
+@pytest.mark.parametrize(
+    ("statements", "expected"),
+    [
+        (
+            [
+                "SELECT products.id FROM products WHERE products.id IN ($1::INTEGER)",
+                "SELECT products.id FROM products WHERE products.id IN ($1::INTEGER, $2::INTEGER, $3::INTEGER)",
+            ],
+            "SELECT products.id FROM products WHERE products.id IN (?)",
+        ),
+        (
+            [
+                "INSERT INTO productprices (product_id, price) VALUES ($1::INTEGER, $2::NUMERIC(14, 2))",
+                "INSERT INTO productprices (product_id, price) VALUES ($1::INTEGER, $2::NUMERIC), "
+                "($3::INTEGER, $4::NUMERIC), ($5::INTEGER, $6::NUMERIC)",
+            ],
+            "INSERT INTO productprices (product_id, price) VALUES (?), ...",
+        ),
+        (
+            [
+                "UPDATE products SET last_price = v.price FROM (VALUES ($1::INTEGER, $2::NUMERIC(14, 2))) AS v",
+                "UPDATE products SET last_price = v.price "
+                "FROM (VALUES ($1::INTEGER, $2::NUMERIC(14, 2)), ($3::INTEGER, $4::NUMERIC(14, 2))) AS v",
+            ],
+            "UPDATE products SET last_price = v.price FROM (VALUES (?), ...) AS v",
+        ),
+    ],
+)
+def test_normalize_sql_collapses_lists(statements: list[str], expected: str):
+    assert {normalize_sql(statement) for statement in statements} == {expected}
+
+
+@pytest.mark.parametrize(
+    ("statement", "expected"),
+    [
+        ("SELECT 1 WHERE x = $1::VARCHAR", "SELECT 1 WHERE x = ?"),
+        ("SELECT 1 WHERE x > $12::TIMESTAMP WITH TIME ZONE", "SELECT 1 WHERE x > ?"),
+        ("SELECT 1 WHERE x = ANY($1::INTEGER[])", "SELECT 1 WHERE x = ANY(?)"),
+        ("SELECT 1 WHERE x = $1::NUMERIC(14, 2)", "SELECT 1 WHERE x = ?"),
+        ("SELECT 1 WHERE x = $1::VARCHAR(255) AND y = $2", "SELECT 1 WHERE x = ? AND y = ?"),
+        ("SELECT 1\n  FROM   users\n WHERE id = $1", "SELECT 1 FROM users WHERE id = ?"),
+    ],
+)
+def test_normalize_sql_strips_casts_and_whitespace(statement: str, expected: str):
+    assert normalize_sql(statement) == expected
+
+
+async def test_track_caller_sets_and_resets_caller():
+    @track_caller
+    class Client:
+        async def load(self) -> str:
+            return current_caller.get()
+
+        async def fail(self) -> None:
+            raise RuntimeError
+
+        async def _private(self) -> str:
+            return current_caller.get()
+
+    client = Client()
+
+    assert await client.load() == "Client.load"
+    assert await client._private() == "-"
+    assert current_caller.get() == "-"
+    with pytest.raises(RuntimeError):
+        await client.fail()
+    assert current_caller.get() == "-"